@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Parse-time benchmark for the VOTD parser registry.
+#
+#   python benchmarks/bench_parsers.py [-n 200] [--history bench_history.jsonl] [page.html ...]
+#
+# Runs every fixture in benchmarks/fixtures (or the given saved pages) through the full
+# registry and through each strategy that detects it, and prints the median time per parse.
+# With --history, one JSON line per run is appended so results can be compared over time.
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'py_modules'))
+
+import votd_parsers  # noqa: E402
+
+def time_call(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def bench_fixture(path, iterations):
+    with open(path, 'rb') as file:
+        html = file.read()
+    results = {'registry': time_call(lambda: votd_parsers.parse_votd_page(html), iterations)}
+    for strategy in votd_parsers.STRATEGIES:
+        if strategy.detect(html, None):
+            results[strategy.name] = time_call(lambda: strategy.parse(html, None), iterations)
+    _, chosen = votd_parsers.parse_votd_page(html)
+    return {'fixture': os.path.basename(path), 'bytes': len(html), 'strategy': chosen, 'median_seconds': results}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the VOTD parser registry")
+    parser.add_argument('pages', nargs='*', help="saved VOTD pages (default: benchmarks/fixtures/*.html)")
+    parser.add_argument('-n', '--iterations', type=int, default=200)
+    parser.add_argument('--history', help="append results as a JSON line to this file")
+    args = parser.parse_args()
+
+    pages = args.pages or sorted(glob.glob(os.path.join(BENCH_DIR, 'fixtures', '*.html')))
+    runs = [bench_fixture(path, args.iterations) for path in pages]
+    for run in runs:
+        timings = ", ".join(f"{name} {seconds * 1e6:.1f}us" for name, seconds in run['median_seconds'].items())
+        print(f"{run['fixture']} ({run['bytes']} bytes, parsed by {run['strategy']}): {timings}")
+
+    if args.history:
+        with open(args.history, 'a') as file:
+            file.write(json.dumps({'timestamp': time.time(), 'iterations': args.iterations, 'runs': runs}) + "\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# Load test for the plugin's localhost server.
+#
+#   python benchmarks/bench_server.py [-c 50] [-r 20] [--latency 50] [--scenario ws --scenario http]
+#                                     [--engine requests] [--max-p99 250] [--history bench_history.jsonl]
+#
+# Starts the plugin in a child process, outside Decky, against a local stand-in for bible.com and
+# GitHub that serves the recorded pages in benchmarks/fixtures with a configurable delay, so it runs
+# offline. Then -c concurrent clients each make -r requests per scenario, and it prints throughput,
+# p50/p99 latency and the server's memory. Exits non-zero on errors or when p99 exceeds --max-p99.
+# Needs aiohttp importable, as it is inside decky-loader.
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+from decky_shim import BENCH_DIR, REPO_DIR, install_decky_shim
+
+HOST = '127.0.0.1'
+# Smallest valid PNG, served for every verse image
+IMAGE_BYTES = bytes.fromhex(
+    '89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489'
+    '0000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082'
+)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+# Child process: the plugin exactly as Decky would run it, but pointed at the stand-in upstream
+def run_plugin(config):
+    install_decky_shim(config['root'], config['verbose'])
+    sys.path.insert(0, REPO_DIR)
+    import main
+    import votd_parsers
+    main.VOTD_URL = f"{config['upstream']}/{{locale}}/verse-of-the-day"
+    main.GITHUB_PACKAGE_URL = f"{config['upstream']}/package.json"
+    main.SERVER_PORT = config['port']
+    votd_parsers.BIBLE_BASE_URL = config['upstream']
+    asyncio.run(main.Plugin()._main())
+
+async def start_upstream(port, page, latency, version):
+    hits = {'votd': 0, 'package': 0, 'image': 0}
+
+    async def votd(request):
+        hits['votd'] += 1
+        await asyncio.sleep(latency)
+        return web.Response(body=page, content_type='text/html', charset='utf-8')
+
+    async def package(request):
+        hits['package'] += 1
+        await asyncio.sleep(latency)
+        return web.json_response({'version': version})
+
+    async def image(request):
+        hits['image'] += 1
+        if 'w' not in request.query:
+            raise web.HTTPBadRequest(text="w is required")  # As the real endpoint does
+        await asyncio.sleep(latency)
+        return web.Response(body=IMAGE_BYTES, content_type='image/png')
+
+    app = web.Application()
+    app.router.add_get('/{locale}/verse-of-the-day', votd)
+    app.router.add_get('/package.json', package)
+    app.router.add_get('/_next/image', image)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, port).start()
+    return runner, hits
+
+# Each scenario is one client: make `requests` calls, appending each call's latency
+async def ws_client(session, base, requests, latencies):
+    async with session.ws_connect(f"{base}/ws") as ws:
+        for request_id in range(requests):
+            start = time.perf_counter()
+            await ws.send_str(json.dumps({"id": request_id, "type": "votd"}))
+            while True:
+                message = json.loads((await ws.receive()).data)
+                if message.get('id') == request_id:
+                    break  # Anything else is a push
+            if 'error' in message:
+                raise RuntimeError(message['error'])
+            latencies.append(time.perf_counter() - start)
+
+async def http_client(session, base, requests, latencies):
+    for _ in range(requests):
+        start = time.perf_counter()
+        async with session.get(f"{base}/api/votd", headers={'Accept-Encoding': 'gzip'}) as response:
+            response.raise_for_status()
+            await response.read()
+        latencies.append(time.perf_counter() - start)
+
+def one_shot_client(path):
+    async def client(session, base, requests, latencies):
+        for _ in range(requests):
+            start = time.perf_counter()
+            async with session.ws_connect(f"{base}{path}") as ws:
+                message = json.loads((await ws.receive()).data)
+            if 'error' in message:
+                raise RuntimeError(message['error'])
+            latencies.append(time.perf_counter() - start)
+    return client
+
+SCENARIOS = {
+    'ws': ws_client,
+    'http': http_client,
+    'votd_ws': one_shot_client('/votd_ws'),
+    'check_update': one_shot_client('/check_update'),
+}
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+# VmRSS and VmHWM (peak) of a process in bytes; Linux only
+def process_memory(pid):
+    memory = {'rss': None, 'peak_rss': None}
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    memory['rss'] = int(line.split()[1]) * 1024
+                elif line.startswith('VmHWM:'):
+                    memory['peak_rss'] = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return memory
+
+async def run_scenario(name, base, clients, requests):
+    latencies = []
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(SCENARIOS[name](session, base, requests, latencies) for _ in range(clients)), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+    failures = [result for result in results if isinstance(result, Exception)]
+    for failure in failures[:3]:
+        print(f"{name}: client failed: {failure!r}", file=sys.stderr)
+    latencies.sort()
+    return {
+        'scenario': name,
+        'clients': clients,
+        'requests': len(latencies),
+        'failed_clients': len(failures),
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0,
+        'p50': percentile(latencies, 0.50),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1] if latencies else None,
+    }
+
+async def wait_for_server(base, process, timeout):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if not process.is_alive():
+                raise RuntimeError(f"plugin exited with code {process.exitcode}")
+            try:
+                # The first verse request waits for the upstream fetch, so it doubles as warm-up
+                async with session.get(f"{base}/api/votd") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"plugin did not answer within {timeout}s")
+
+async def bench(args, root):
+    upstream_port, plugin_port = free_port(), free_port()
+    with open(os.path.join(BENCH_DIR, 'fixtures', args.fixture), 'rb') as file:
+        page = file.read()
+    upstream, hits = await start_upstream(upstream_port, page, args.latency / 1000, 'bench')
+
+    os.makedirs(os.path.join(root, 'settings'), exist_ok=True)
+    with open(os.path.join(root, 'settings', 'settings.json'), 'w') as file:
+        json.dump({'http_engine': args.engine}, file)
+
+    config = {'root': root, 'upstream': f"http://{HOST}:{upstream_port}", 'port': plugin_port, 'verbose': args.verbose}
+    process = multiprocessing.get_context('spawn').Process(target=run_plugin, args=(config,), daemon=True)
+    process.start()
+    base = f"http://{HOST}:{plugin_port}"
+    runs = []
+    try:
+        await wait_for_server(base, process, args.startup_timeout)
+        for name in args.scenario or list(SCENARIOS):
+            run = await run_scenario(name, base, args.clients, args.requests)
+            run.update(process_memory(process.pid))
+            runs.append(run)
+        if args.metrics:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"{base}/metrics") as response:
+                    print(await response.text())
+    finally:
+        process.terminate()
+        process.join()
+        await upstream.cleanup()
+    return runs, hits
+
+def format_ms(seconds):
+    return "n/a" if seconds is None else f"{seconds * 1e3:.2f}ms"
+
+def format_mib(size):
+    return "n/a" if size is None else f"{size / (1024 * 1024):.1f}MiB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the plugin server against a local upstream stand-in")
+    parser.add_argument('-c', '--clients', type=int, default=50, help="concurrent clients per scenario")
+    parser.add_argument('-r', '--requests', type=int, default=20, help="requests per client")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help="scenario to run, repeatable (default: all)")
+    parser.add_argument('--latency', type=float, default=50, help="upstream response delay in milliseconds")
+    parser.add_argument('--fixture', default='votd_next_data.html', help="page in benchmarks/fixtures served as the VOTD")
+    parser.add_argument('--engine', default='requests', help="http_engine setting for the plugin")
+    parser.add_argument('--startup-timeout', type=float, default=30)
+    parser.add_argument('--max-p99', type=float, help="fail if any scenario's p99 exceeds this many milliseconds")
+    parser.add_argument('--metrics', action='store_true', help="print the server's /metrics at the end")
+    parser.add_argument('--history', help="append results as a JSON line to this file")
+    parser.add_argument('-v', '--verbose', action='store_true', help="show the plugin's info logs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='youversion-bench-') as root:
+        runs, hits = asyncio.run(bench(args, root))
+
+    failed = False
+    for run in runs:
+        print(f"{run['scenario']}: {run['clients']} clients, {run['requests']} requests in {run['seconds']:.2f}s, "
+              f"{run['throughput']:.0f} req/s, p50 {format_ms(run['p50'])}, p99 {format_ms(run['p99'])}, "
+              f"max {format_ms(run['max'])}, server RSS {format_mib(run['rss'])} (peak {format_mib(run['peak_rss'])})")
+        if run['failed_clients'] or not run['requests']:
+            print(f"{run['scenario']}: {run['failed_clients']} clients failed", file=sys.stderr)
+            failed = True
+        elif args.max_p99 is not None and run['p99'] * 1e3 > args.max_p99:
+            print(f"{run['scenario']}: p99 {format_ms(run['p99'])} is over the {args.max_p99}ms limit", file=sys.stderr)
+            failed = True
+    print(f"upstream requests: {hits}")
+
+    if args.history:
+        with open(args.history, 'a') as file:
+            record = {'timestamp': time.time(), 'clients': args.clients, 'requests': args.requests,
+                      'latency_ms': args.latency, 'engine': args.engine, 'runs': runs, 'upstream': hits}
+            file.write(json.dumps(record) + "\n")
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
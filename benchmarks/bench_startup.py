@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# Startup benchmark for main.py: how long the import takes, and how long until the server
+# answers a verse request from the on-disk cache.
+#
+#   python benchmarks/bench_startup.py [-n 5] [--engine requests] [--history bench_history.jsonl]
+#
+# Each run starts a fresh interpreter with a warm cache for today seeded on disk and every upstream
+# URL pointing at a closed port, so nothing can come from the network. It reports the median import
+# time, time to first response (from process start), the bare interpreter start for comparison,
+# and whether the HTTP client stack (requests) had been imported by the time main.py finished loading.
+
+import argparse
+import datetime
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from decky_shim import BENCH_DIR, REPO_DIR, install_decky_shim
+
+HOST = '127.0.0.1'
+CLOSED_URL = f"http://{HOST}:9"  # Discard port: nothing listens, so any fetch fails fast
+
+# Child process: time the import, report it on stdout, then run the plugin
+def run_child(config):
+    install_decky_shim(config['root'])
+    sys.path.insert(0, REPO_DIR)
+    start = time.perf_counter()
+    import main
+    import_seconds = time.perf_counter() - start
+    print(json.dumps({'import_seconds': import_seconds, 'requests_loaded': 'requests' in sys.modules}), flush=True)
+    main.VOTD_URL = f"{CLOSED_URL}/{{locale}}/verse-of-the-day"
+    main.GITHUB_PACKAGE_URL = f"{CLOSED_URL}/package.json"
+    main.SERVER_PORT = config['port']
+
+    import asyncio
+    asyncio.run(main.Plugin()._main())
+
+def free_port():
+    import socket
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+# Today's verse and a recent update check on disk, as after any earlier run of the plugin
+def seed_caches(root, engine):
+    sys.path.insert(0, os.path.join(REPO_DIR, 'py_modules'))
+    import votd_parsers
+    with open(os.path.join(BENCH_DIR, 'fixtures', 'votd_next_data.html'), 'rb') as file:
+        votd, _ = votd_parsers.parse_votd_page(file.read())
+    votd['images'] = []  # Images would be downloaded in the background; keep the run offline
+    now = time.time()
+    key = f"{datetime.date.today().isoformat()}|en|default"
+    runtime = os.path.join(root, 'runtime')
+    settings = os.path.join(root, 'settings')
+    os.makedirs(runtime, exist_ok=True)
+    os.makedirs(settings, exist_ok=True)
+    files = {
+        os.path.join(runtime, 'votd_cache.json'): {key: {'fetched_at': now, 'data': votd, 'validators': {}}},
+        os.path.join(runtime, 'update_cache.json'): {'update': {'fetched_at': now, 'data': {'status': 'Up-to-date', 'local_version': 'bench', 'github_version': 'bench'}}, 'github': {}},
+        os.path.join(settings, 'settings.json'): {'http_engine': engine, 'votd_locales': ['en']},
+    }
+    for path, data in files.items():
+        with open(path, 'w') as file:
+            json.dump(data, file)
+
+def try_request(port, path):
+    connection = http.client.HTTPConnection(HOST, port, timeout=1)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    except OSError:
+        return None
+    finally:
+        connection.close()
+
+def run_once(engine, timeout):
+    with tempfile.TemporaryDirectory(prefix='youversion-startup-') as root:
+        seed_caches(root, engine)
+        port = free_port()
+        config = {'root': root, 'port': port}
+        start = time.perf_counter()
+        child = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', json.dumps(config)], stdout=subprocess.PIPE, text=True)
+        try:
+            report = json.loads(child.stdout.readline())
+            while time.perf_counter() - start < timeout:
+                if child.poll() is not None:
+                    raise RuntimeError(f"plugin exited with code {child.returncode}")
+                if try_request(port, '/api/votd') == 200:
+                    report['first_response_seconds'] = time.perf_counter() - start
+                    return report
+                time.sleep(0.002)
+            raise RuntimeError(f"no response within {timeout}s")
+        finally:
+            child.terminate()
+            child.wait()
+
+def interpreter_start():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark main.py import time and time to first response")
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    parser.add_argument('--engine', default='requests', help="http_engine setting for the plugin")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--history', help="append results as a JSON line to this file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(json.loads(args.child))
+        return
+
+    runs = [run_once(args.engine, args.timeout) for _ in range(args.runs)]
+    result = {
+        'interpreter_seconds': statistics.median(interpreter_start() for _ in range(args.runs)),
+        'import_seconds': statistics.median(run['import_seconds'] for run in runs),
+        'first_response_seconds': statistics.median(run['first_response_seconds'] for run in runs),
+        'requests_loaded_at_import': any(run['requests_loaded'] for run in runs),
+    }
+    print(f"interpreter start {result['interpreter_seconds'] * 1e3:.1f}ms, import main.py {result['import_seconds'] * 1e3:.1f}ms, "
+          f"first response {result['first_response_seconds'] * 1e3:.1f}ms (median of {args.runs}, engine {args.engine}); "
+          f"requests loaded at import: {result['requests_loaded_at_import']}")
+
+    if args.history:
+        with open(args.history, 'a') as file:
+            file.write(json.dumps({'timestamp': time.time(), 'runs': args.runs, 'engine': args.engine, **result}) + "\n")
+
+if __name__ == '__main__':
+    main()
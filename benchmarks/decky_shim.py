@@ -0,0 +1,35 @@
+# Stand-in for the decky_plugin module that decky-loader injects, so the benchmarks can load
+# main.py outside Decky. Deliberately imports nothing heavy, for bench_startup's timings.
+
+import json
+import logging
+import os
+import sys
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+def read_json(path):
+    with open(path) as file:
+        return json.load(file)
+
+# Install the shim with every plugin directory under root; returns the module
+def install_decky_shim(root, verbose=False):
+    shim = types.ModuleType('decky_plugin')
+    shim.HOME = shim.DECKY_HOME = shim.DECKY_USER_HOME = root
+    shim.USER = shim.DECKY_USER = 'bench'
+    shim.DECKY_VERSION = 'bench'
+    shim.DECKY_PLUGIN_DIR = REPO_DIR
+    shim.DECKY_PLUGIN_NAME = read_json(os.path.join(REPO_DIR, 'plugin.json'))['name']
+    shim.DECKY_PLUGIN_VERSION = read_json(os.path.join(REPO_DIR, 'package.json'))['version']
+    shim.DECKY_PLUGIN_AUTHOR = 'bench'
+    for name, sub in (('DECKY_PLUGIN_SETTINGS_DIR', 'settings'), ('DECKY_PLUGIN_RUNTIME_DIR', 'runtime'), ('DECKY_PLUGIN_LOG_DIR', 'logs')):
+        path = os.path.join(root, sub)
+        os.makedirs(path, exist_ok=True)
+        setattr(shim, name, path)
+    shim.DECKY_PLUGIN_LOG = os.path.join(shim.DECKY_PLUGIN_LOG_DIR, 'plugin.log')
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING, format="[plugin] %(levelname)s %(message)s")
+    shim.logger = logging.getLogger(shim.DECKY_PLUGIN_NAME)
+    sys.modules['decky_plugin'] = shim
+    return shim
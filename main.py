@@ -14,34 +14,1203 @@ import decky_plugin
 add_plugin_to_path()
 
 import os
+import errno
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 import asyncio
+import bisect
 import json
 import re
-import requests
-from decky_plugin import DECKY_PLUGIN_DIR, DECKY_USER_HOME
+import time
+import datetime
+import functools
+import hashlib
+import gzip
+import html
+import mimetypes
+import random
+import threading
+import inspect
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+import aiohttp
+from decky_plugin import DECKY_PLUGIN_DIR, DECKY_PLUGIN_RUNTIME_DIR, DECKY_PLUGIN_SETTINGS_DIR, DECKY_USER_HOME
 from aiohttp import web
 import decky_plugin
+from votd_parsers import NEXT_DATA_OPEN, NEXT_DATA_CLOSE, VotdParseError, parse_votd_page
+
+# Logging: records go through a queue to a writer thread, so file I/O never runs on the event
+# loop, and each message template is rate limited so a hot path can't flood the log file.
+# Hot paths log with %-style arguments: formatting then happens on the writer thread, and the
+# unformatted template is what the rate limit counts.
+LOG_QUEUE_SIZE = 10000  # Records waiting for the writer thread; past this, new ones are dropped
+LOG_RATE_LIMIT = 10  # Records let through per message template and level in each window
+LOG_RATE_WINDOW = 60  # Seconds
+LOG_RATE_MAX_KEYS = 1024  # Templates tracked at once before expired windows are pruned
+
+# Lets the first LOG_RATE_LIMIT records of each template through per window and counts the rest;
+# the first record of the next window says how many were suppressed
+class RateLimitFilter(logging.Filter):
+    def __init__(self, limit=LOG_RATE_LIMIT, window=LOG_RATE_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()  # Executor threads log too
+        self.windows = {}  # (logger name, level, template) -> [window start, passed, suppressed]
+        self.suppressed = 0
+
+    def filter(self, record):
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            state = self.windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                if state is None and len(self.windows) >= LOG_RATE_MAX_KEYS:
+                    self._prune(now)
+                if state and state[2]:
+                    record.msg = f"{record.msg} ({state[2]} similar messages suppressed)"
+                state = self.windows[key] = [now, 0, 0]
+            if state[1] < self.limit:
+                state[1] += 1
+                return True
+            state[2] += 1
+            self.suppressed += 1
+            return False
+
+    def _prune(self, now):
+        self.windows = {key: state for key, state in self.windows.items() if now - state[0] < self.window}
+        if len(self.windows) >= LOG_RATE_MAX_KEYS:
+            self.windows = {}
+
+class AsyncLogHandler(QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    # The listener runs in this process, so records are queued as they are and formatted on
+    # the writer thread instead of the caller's
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+# Move the handlers that write the plugin's log onto a writer thread, behind an AsyncLogHandler.
+# Returns (handler, uninstall); uninstall writes out what is still queued and puts things back.
+def install_async_logging(logger):
+    # decky-loader attaches the log file to the root logger; prefer the logger's own handlers if any
+    target = logger if logger.handlers else logging.getLogger()
+    handlers = [handler for handler in target.handlers if not isinstance(handler, AsyncLogHandler)]
+    if not handlers:
+        return None, lambda: None
+    handler = AsyncLogHandler(queue.Queue(LOG_QUEUE_SIZE))
+    handler.addFilter(RateLimitFilter())
+    for existing in handlers:
+        target.removeHandler(existing)
+    target.addHandler(handler)
+    listener = QueueListener(handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    def uninstall():
+        listener.stop()
+        target.removeHandler(handler)
+        for existing in handlers:
+            target.addHandler(existing)
+    return handler, uninstall
+
+# On-disk VOTD cache, so a restart can answer from disk without scraping again
+VOTD_CACHE_PATH = os.path.join(DECKY_PLUGIN_RUNTIME_DIR, 'votd_cache.json')
+VOTD_CACHE_TTL = 24 * 60 * 60  # Hard upper bound on entry age, in seconds
+VOTD_REVALIDATE_AFTER = 3 * 60 * 60  # Age after which an entry is revalidated with a conditional GET
+DEFAULT_LOCALE = 'en'
+VOTD_URL = "https://www.bible.com/{locale}/verse-of-the-day"
+VOTD_MAX_TRACKED = 16  # Locale/version pairs the background refresher keeps warm
+VOTD_TRACKED_IDLE = 24 * 60 * 60  # Stop refreshing a requested pair after this long without requests or subscribers
+VOTD_TRACKED_MAX_FAILURES = 5  # ...or after this many failed refreshes in a row
+VOTD_FAILURES_MAX = 256  # Locale/version pairs whose fetch backoff is remembered
+LOCALE_RE = re.compile(r'^[a-z]{2,3}(-[A-Za-z0-9]{2,4})?$')
+VERSION_RE = re.compile(r'^[A-Za-z0-9-]{1,16}$')
+
+# Validate a (locale, version) pair from a client; raises ValueError
+def check_votd_key(locale, version=None):
+    if not LOCALE_RE.match(locale or ''):
+        raise ValueError(f"Invalid locale {locale!r}")
+    if version is not None and not VERSION_RE.match(version):
+        raise ValueError(f"Invalid version {version!r}")
+    return locale, version
+
+# Parse 'en', 'en:111' or 'en,es:149' into [(locale, version), ...]; raises ValueError,
+# also when there are more than limit keys
+def parse_votd_keys(value, limit=None):
+    keys = []
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        locale, _, version = item.partition(':')
+        keys.append(check_votd_key(locale, version or None))
+    if limit is not None and len(keys) > limit:
+        raise ValueError(f"At most {limit} locales per request")
+    return keys
+
+# Build the cache key for a verse: (local date, locale, version)
+def votd_cache_key(locale=DEFAULT_LOCALE, version=None, day=None):
+    day = day or datetime.date.today()
+    return f"{day.isoformat()}|{locale}|{version or 'default'}"
+
+# An entry is only fresh on the local day it was fetched for, so it rolls over at midnight
+def votd_entry_fresh(key, entry, now=None):
+    now = now or time.time()
+    today = datetime.date.today().isoformat()
+    return key.split('|', 1)[0] == today and now - entry.get('fetched_at', 0) < VOTD_CACHE_TTL
+
+# Same-day entries past VOTD_REVALIDATE_AFTER are still usable, but get checked upstream
+def votd_entry_needs_revalidation(entry, now=None):
+    now = now or time.time()
+    return now - entry.get('fetched_at', 0) >= VOTD_REVALIDATE_AFTER
+
+# Today's entry if there is one, otherwise the newest older entry for the same locale/version.
+# Returns (entry, stale); stale entries are still served while a refresh runs in the background.
+def find_votd_entry(entries, locale=DEFAULT_LOCALE, version=None):
+    key = votd_cache_key(locale, version)
+    entry = entries.get(key)
+    if entry and votd_entry_fresh(key, entry):
+        return entry, votd_entry_needs_revalidation(entry)
+    suffix = key.split('|', 1)[1]
+    older = [e for k, e in entries.items() if k.split('|', 1)[1] == suffix]
+    if older:
+        return max(older, key=lambda e: e.get('fetched_at', 0)), True
+    return None, True
+
+# Keep today's entries plus the newest entry per locale/version, as a stale fallback.
+# If pairs is given, only those (locale, version) pairs keep a fallback.
+def prune_votd_entries(entries, pairs=None):
+    suffixes = None if pairs is None else {votd_cache_key(locale, version).split('|', 1)[1] for locale, version in pairs}
+    newest = {}
+    for key, entry in entries.items():
+        suffix = key.split('|', 1)[1]
+        if suffixes is not None and suffix not in suffixes:
+            continue
+        if suffix not in newest or entry.get('fetched_at', 0) > entries[newest[suffix]].get('fetched_at', 0):
+            newest[suffix] = key
+    keep = set(newest.values())
+    return {key: entry for key, entry in entries.items() if key in keep or votd_entry_fresh(key, entry)}
+
+def read_json_file(path, default):
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return default
+    except (OSError, json.JSONDecodeError) as e:
+        decky_plugin.logger.error(f"Failed to read {path}: {e}")
+        return default
+
+def write_json_file(path, data):
+    # Write to a temp file and rename, so a crash never leaves a half-written file
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        decky_plugin.logger.error(f"Failed to write {path}: {e}")
+
+def load_votd_cache():
+    # Drop anything left over from previous days that isn't needed as a fallback
+    return prune_votd_entries(read_json_file(VOTD_CACHE_PATH, {}))
+
+def save_votd_cache(entries):
+    write_json_file(VOTD_CACHE_PATH, entries)
+
+# VOTD archive: every verse we have seen, keyed like the cache by date/locale/version
+VOTD_ARCHIVE_PATH = os.path.join(DECKY_PLUGIN_RUNTIME_DIR, 'votd_archive.json')
+VOTD_BACKFILL_DAYS = 7  # Days backfilled in the background on startup
+VOTD_BACKFILL_CONCURRENCY = 3
+
+# Earlier years can no longer be served (see first_archive_day), so they are dropped on load
+def load_votd_archive():
+    first_day = first_archive_day().isoformat()
+    return {key: votd for key, votd in read_json_file(VOTD_ARCHIVE_PATH, {}).items() if key[:10] >= first_day}
+
+def save_votd_archive(archive):
+    write_json_file(VOTD_ARCHIVE_PATH, archive)
+
+# bible.com addresses past verses by day of year, with no year, so only this year's can be fetched
+def first_archive_day():
+    return datetime.date.today().replace(month=1, day=1)
+
+# Parse a YYYY-MM-DD query value; raises ValueError for bad input
+def parse_votd_date(value):
+    day = datetime.date.fromisoformat(value)
+    if not first_archive_day() <= day <= datetime.date.today():
+        raise ValueError(f"{value} is not between {first_archive_day()} and today")
+    return day
+
+def date_range(start, end):
+    return [start + datetime.timedelta(days=n) for n in range((end - start).days + 1)]
+
+# Local image cache: VOTD images are downloaded once and served from the plugin server
+SERVER_HOST = 'localhost'
+SERVER_PORT = 8777
+PORT_FALLBACK_ATTEMPTS = 10  # Ports after SERVER_PORT to try before letting the OS pick one
+UNIX_SOCKET_PATH = os.path.join(DECKY_PLUGIN_RUNTIME_DIR, 'server.sock')
+SERVER_INFO_PATH = os.path.join(DECKY_PLUGIN_RUNTIME_DIR, 'server.json')  # Where local tools find the listeners
+IMAGE_CACHE_DIR = os.path.join(DECKY_PLUGIN_RUNTIME_DIR, 'images')
+IMAGE_INDEX_PATH = os.path.join(IMAGE_CACHE_DIR, 'index.json')
+IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+IMAGE_CACHE_CONTROL = 'public, max-age=31536000, immutable'  # Files are named by content hash
+IMAGE_RETRY_BASE = 60  # Seconds before retrying a failed image download, doubled on each failure
+IMAGE_RETRY_MAX = 6 * 60 * 60
+IMAGE_NAME_RE = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]{1,5}$')
+
+# Content-addressed file name: sha256 of the bytes plus an extension for the content type
+def image_file_name(content, content_type, url):
+    ext = mimetypes.guess_extension((content_type or '').split(';')[0].strip()) or os.path.splitext(url.split('?')[0])[1] or '.img'
+    ext = {'.jpe': '.jpg', '.jpeg': '.jpg'}.get(ext, ext).lower()
+    return hashlib.sha256(content).hexdigest() + ext
+
+def local_image_url(name, port=SERVER_PORT):
+    return f"http://{SERVER_HOST}:{port}/images/{name}"
+
+# Remove least recently used files until the cache fits in max_bytes.
+# File mtimes are bumped on every serve, so they double as the LRU clock.
+def evict_images(index, max_bytes=IMAGE_CACHE_MAX_BYTES):
+    files = []
+    for url, name in index.items():
+        try:
+            stat = os.stat(os.path.join(IMAGE_CACHE_DIR, name))
+            files.append((stat.st_mtime, stat.st_size, url, name))
+        except FileNotFoundError:
+            pass
+    total = sum(size for _, size, _, _ in files)
+    present = {url for _, _, url, _ in files}
+    evicted = [url for url in index if url not in present]
+    for _, size, url, name in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(IMAGE_CACHE_DIR, name))
+        except OSError as e:
+            decky_plugin.logger.error(f"Failed to evict cached image {name}: {e}")
+            continue
+        total -= size
+        evicted.append(url)
+    for url in evicted:
+        del index[url]
+    return evicted
+
+# User-tunable settings, read once from settings.json at startup
+SETTINGS_PATH = os.path.join(DECKY_PLUGIN_SETTINGS_DIR, 'settings.json')
+DEFAULT_SETTINGS = {
+    'executor_workers': 4,  # Threads for blocking I/O (HTTP requests, file writes)
+    'executor_timeout': 60,  # Seconds a caller waits for a blocking task before giving up
+    'http_engine': 'requests',  # 'requests' (threaded, vendored) or 'aiohttp' (native asyncio)
+    'max_concurrent_fetches': 6,  # Global cap on VOTD page fetches in flight, across all locales
+    'votd_locales': ['en'],  # Verses kept warm by the background refresher, as 'locale' or 'locale:version'
+    'update_check_interval': 12 * 60 * 60,  # Seconds between background GitHub update checks
+    'listen_tcp': True,  # Serve on SERVER_HOST:SERVER_PORT (or the next free port); the frontend needs this
+    'unix_socket': False,  # Also serve on UNIX_SOCKET_PATH, for CLI tools and other plugins on the device
+}
+
+def load_settings():
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(read_json_file(SETTINGS_PATH, {}))
+    return settings
+
+# Plugin-owned thread pool for blocking calls, so we neither starve nor get starved by
+# whatever else is using the loop's default executor inside decky-loader
+class BlockingExecutor:
+    def __init__(self, workers=DEFAULT_SETTINGS['executor_workers'], timeout=DEFAULT_SETTINGS['executor_timeout']):
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="youversion-io")
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.queued = 0  # Submitted but waiting for a free thread
+        self.active = 0  # Currently running on a thread
+        self.completed = 0
+        self.timeouts = 0
+
+    def _track(self, func, *args, **kwargs):
+        with self.lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.completed += 1
+
+    # Run func in the pool. On timeout the caller gets asyncio.TimeoutError; the thread itself
+    # can't be interrupted, so the underlying call should carry its own (HTTP) timeout as well.
+    async def run(self, func, *args, timeout=None, **kwargs):
+        with self.lock:
+            self.queued += 1
+        pool_future = self.pool.submit(self._track, func, *args, **kwargs)
+        # A call cancelled before it started (timeout, caller gone, shutdown) never reaches _track
+        pool_future.add_done_callback(self._unqueue_cancelled)
+        future = asyncio.wrap_future(pool_future)
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            with self.lock:
+                self.timeouts += 1
+            raise
+
+    def _unqueue_cancelled(self, pool_future):
+        if pool_future.cancelled():
+            with self.lock:
+                self.queued -= 1
+
+    def stats(self):
+        with self.lock:
+            return {'workers': self.workers, 'queued': self.queued, 'active': self.active, 'completed': self.completed, 'timeouts': self.timeouts}
+
+    def shutdown(self):
+        # Drop work that hasn't started yet; running calls finish on their own timeouts
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+# Writes JSON files on the executor, so the event loop never waits on the disk. Writes to a
+# path run one at a time, and while one runs only the newest data for that path is kept.
+class JsonWriter:
+    def __init__(self, executor):
+        self.executor = executor
+        self.pending = {}  # path -> data to write once the running write finishes
+        self.running = {}  # path -> task writing it
+        self.closed = False
+
+    # data must not be mutated afterwards; pass a copy of anything that is changed in place
+    def write(self, path, data):
+        if self.closed:
+            return  # A fetch that finished during shutdown; the final flush has already run
+        self.pending[path] = data
+        if path not in self.running:
+            self.running[path] = asyncio.ensure_future(self._drain(path))
+
+    async def _drain(self, path):
+        try:
+            while path in self.pending:
+                try:
+                    await self.executor.run(write_json_file, path, self.pending.pop(path))
+                except asyncio.TimeoutError:
+                    decky_plugin.logger.error(f"Timed out writing {path}")
+        finally:
+            del self.running[path]
+
+    async def flush(self):
+        await asyncio.gather(*list(self.running.values()), return_exceptions=True)
+
+    # Wait for running writes and refuse any further ones
+    async def close(self):
+        self.closed = True
+        await self.flush()
+
+# Shared outbound HTTP client: one pooled requests.Session for the whole plugin
+HTTP_TIMEOUT = (5, 20)  # (connect, read) seconds, used when a call doesn't pass its own
+HTTP_POOL_CONNECTIONS = 4  # Number of per-host pools the default adapter keeps around
+HTTP_POOL_MAXSIZE = 4  # Keep-alive connections per host for the default adapter
+HTTP_HOST_POOLS = {
+    "https://www.bible.com": 8,
+    "https://raw.githubusercontent.com": 2,
+}
+
+# Background refresher: keeps the caches warm so handlers never wait on the network
+UPDATE_CACHE_PATH = os.path.join(DECKY_PLUGIN_RUNTIME_DIR, 'update_cache.json')
+GITHUB_PACKAGE_URL = "https://raw.githubusercontent.com/moraroy/YouVersion-Bible/main/package.json"
+REFRESH_AHEAD = 10 * 60  # Refresh this long before an entry would go stale
+REFRESH_JITTER = 60  # Random extra delay, so refreshes don't all line up
+REFRESH_BACKOFF_BASE = 30  # First retry delay after a failed refresh, doubled on each failure
+REFRESH_BACKOFF_MAX = 30 * 60
+
+def seconds_until_midnight():
+    now = datetime.datetime.now()
+    midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+    return (midnight - now).total_seconds()
+
+# asyncio.sleep runs on the monotonic clock, which stops while the Deck is suspended, so long
+# waits are taken in slices of at most this many seconds and checked against the wall clock
+WALL_CLOCK_SLICE = 60
+
+async def sleep_wall_clock(seconds):
+    deadline = time.time() + seconds
+    while (left := deadline - time.time()) > 0:
+        await asyncio.sleep(min(WALL_CLOCK_SLICE, left))
+
+# Freshness info sent to clients next to every cached payload. There is no live age field,
+# since payloads are serialized once per entry; clients derive it from fetched_at.
+def cache_metadata(entry, stale):
+    return {'fetched_at': entry['fetched_at'], 'stale': stale}
+
+# Run refresh() whenever due_in() says it is due, backing off exponentially while it fails.
+# Stops once wanted(failures), if given, returns False.
+async def keep_fresh(name, refresh, due_in, wanted=None):
+    failures = 0
+    while wanted is None or wanted(failures):
+        if failures:
+            delay = min(REFRESH_BACKOFF_MAX, REFRESH_BACKOFF_BASE * 2 ** (failures - 1))
+        else:
+            delay = max(0, due_in())
+        # Only jitter scheduled refreshes; one that is already due (nothing cached yet) runs now
+        if delay > 0:
+            delay += random.uniform(0, REFRESH_JITTER)
+        await sleep_wall_clock(delay)
+        if wanted is not None and not wanted(failures):
+            break  # Went unused while we slept
+        try:
+            ok = await refresh()
+        except Exception as e:
+            decky_plugin.logger.error(f"Background refresh of {name} failed: {e}")
+            ok = False
+        failures = 0 if ok else failures + 1
+        if failures:
+            decky_plugin.logger.warning(f"Background refresh of {name} failed {failures} time(s) in a row")
+
+# Result of an upstream fetch; status 304 means the cached copy is still current and body is None
+# next_data holds the raw __NEXT_DATA__ JSON when the page was read in streaming mode
+FetchResult = namedtuple('FetchResult', ['status', 'body', 'validators', 'next_data', 'content_type'], defaults=(None, None))
+
+# Raised by either fetch engine for network errors and 4xx/5xx responses
+class FetchError(Exception):
+    pass
+
+# Streaming VOTD extraction: read the page in chunks and hang up once __NEXT_DATA__ is complete
+VOTD_STREAMING = True
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Incremental search for the __NEXT_DATA__ script, fed one chunk at a time by either engine.
+# Next.js renders the page markup before __NEXT_DATA__, so the html prefix still carries the images.
+class NextDataScanner:
+    def __init__(self):
+        self.buffer = bytearray()
+        self.start = -1
+        self.scanned = 0
+        self.next_data = None  # Script payload, once the closing tag has arrived
+
+    # Returns True once the script is complete and the rest of the page can be dropped
+    def feed(self, chunk):
+        self.buffer += chunk
+        if self.start < 0:
+            # Only rescan the new bytes, plus enough overlap to catch a tag split across chunks
+            self.start = self.buffer.find(NEXT_DATA_OPEN, max(0, self.scanned - len(NEXT_DATA_OPEN)))
+            if self.start < 0:
+                self.scanned = len(self.buffer)
+                return False
+            self.scanned = self.start + len(NEXT_DATA_OPEN)
+        end = self.buffer.find(NEXT_DATA_CLOSE, max(self.start + len(NEXT_DATA_OPEN), self.scanned - len(NEXT_DATA_CLOSE)))
+        if end < 0:
+            self.scanned = len(self.buffer)
+            return False
+        self.next_data = bytes(self.buffer[self.start + len(NEXT_DATA_OPEN):end])
+        return True
+
+    # Html before the script tag, or the whole page if the tag never closed
+    def html(self):
+        return bytes(self.buffer[:self.start]) if self.next_data is not None else bytes(self.buffer)
+
+# Returns (html before the script tag, script payload); payload is None if the tag never closed.
+def read_until_next_data(response, chunk_size=STREAM_CHUNK_SIZE):
+    scanner = NextDataScanner()
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if scanner.feed(chunk):
+                break
+        return scanner.html(), scanner.next_data
+    finally:
+        # Drops the rest of the page; the connection is discarded rather than drained
+        response.close()
+
+# Build If-None-Match / If-Modified-Since headers from stored validators
+def conditional_headers(validators):
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+# Pull the validators worth keeping out of a response
+def response_validators(response):
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+class HttpClient:
+    def __init__(self, timeout=HTTP_TIMEOUT, host_pools=HTTP_HOST_POOLS):
+        # requests (with urllib3, chardet and certifi) is over half of main.py's import time,
+        # so it is only loaded once something actually goes out to the network
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = f"YouVersion-Decky/{decky_plugin.DECKY_PLUGIN_VERSION}"
+        default_adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+        self.session.mount("https://", default_adapter)
+        self.session.mount("http://", default_adapter)
+        # Longer prefixes win in Session.get_adapter, so these override the defaults per host
+        for prefix, maxsize in host_pools.items():
+            self.session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=maxsize))
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        # Closes every mounted adapter and with it the pooled keep-alive sockets
+        self.session.close()
+
+# Fetch engines: both expose `await get(url, headers=None, params=None, stream=False) -> FetchResult`
+# and `await close()`. stream=True reads only up to the end of the __NEXT_DATA__ script.
+HTTP_ENGINES = ('requests', 'aiohttp')
+DNS_CACHE_TTL = 300
+
+# Synchronous requests session, driven from the plugin's BlockingExecutor
+class RequestsFetcher:
+    def __init__(self, executor):
+        self.client = None  # HttpClient, created by the first fetch
+        self.client_lock = threading.Lock()
+        self.executor = executor
+
+    # Runs on an executor thread, so the first fetch imports requests off the event loop
+    def _client(self):
+        with self.client_lock:
+            if self.client is None:
+                self.client = HttpClient()
+            return self.client
+
+    def _get(self, url, headers, params, stream):
+        import requests
+        try:
+            return self._fetch(url, headers, params, stream)
+        except requests.exceptions.RequestException as e:
+            raise FetchError(str(e)) from e
+
+    def _fetch(self, url, headers, params, stream):
+        response = self._client().get(url, headers=headers, params=params, stream=stream)
+        response.raise_for_status()  # Will raise an error for 4xx/5xx responses
+        validators = response_validators(response)
+        content_type = response.headers.get('Content-Type')
+        if response.status_code == 304:
+            # Reading the empty body hands the connection back to the pool; close() would drop it
+            response.content
+            return FetchResult(304, None, validators, None, content_type)
+        # Keep the body as raw bytes: Response.text would run chardet over the whole page
+        # whenever the server leaves out a charset
+        if not stream:
+            return FetchResult(response.status_code, response.content, validators, None, content_type)
+        html, next_data = read_until_next_data(response)
+        return FetchResult(response.status_code, html, validators, next_data, content_type)
+
+    async def get(self, url, headers=None, params=None, stream=False):
+        return await self.executor.run(self._get, url, headers, params, stream)
+
+    async def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+# Native asyncio client: no thread per request, so dozens of fetches can run at once
+class AiohttpFetcher:
+    def __init__(self):
+        self.session = None
+
+    def _session(self):
+        # Created lazily so it binds to the running loop
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=sum(HTTP_HOST_POOLS.values()) + HTTP_POOL_MAXSIZE, limit_per_host=max(HTTP_HOST_POOLS.values()), ttl_dns_cache=DNS_CACHE_TTL)
+            timeout = aiohttp.ClientTimeout(sock_connect=HTTP_TIMEOUT[0], sock_read=HTTP_TIMEOUT[1])
+            headers = {"User-Agent": f"YouVersion-Decky/{decky_plugin.DECKY_PLUGIN_VERSION}"}
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers)
+        return self.session
+
+    async def get(self, url, headers=None, params=None, stream=False):
+        try:
+            async with self._session().get(url, headers=headers, params=params) as response:
+                response.raise_for_status()
+                validators = response_validators(response)
+                content_type = response.headers.get('Content-Type')
+                if response.status == 304:
+                    return FetchResult(304, None, validators, None, content_type)
+                if not stream:
+                    return FetchResult(response.status, await response.read(), validators, None, content_type)
+                scanner = NextDataScanner()
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    if scanner.feed(chunk):
+                        # Leaving the block early releases the connection without reading the rest
+                        break
+                return FetchResult(response.status, scanner.html(), validators, scanner.next_data, content_type)
+        except aiohttp.ClientError as e:
+            raise FetchError(str(e)) from e
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+def create_fetcher(engine, executor):
+    if engine == 'aiohttp':
+        return AiohttpFetcher()
+    if engine != 'requests':
+        decky_plugin.logger.warning(f"Unknown http_engine {engine!r}, expected one of {HTTP_ENGINES}")
+    return RequestsFetcher(executor)
+
+# Coalesces concurrent calls for the same key onto a single in-flight task
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        # Shield so a caller that goes away doesn't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    def cancel(self):
+        for task in list(self.calls.values()):
+            task.cancel()
+
+# Use orjson for serializing payloads when it is installed, the stdlib otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'))
+
+# Wrap an already serialized payload in a JSON object, without decoding it again
+def envelope(fields, data):
+    head = dumps(fields)
+    if data is None:
+        return head
+    return head[:-1] + (',' if len(head) > 2 else '') + '"data":' + data + '}'
+
+# A serialized JSON payload; the HTTP forms (bytes, strong ETag, gzip) are derived on first use.
+# data is the object it was serialized from, for callers that need a dict; treat it as read-only.
+GZIP_MIN_SIZE = 512  # Smaller bodies aren't worth compressing
+
+class Payload:
+    def __init__(self, text, data=None):
+        self.text = text
+        self.data = data
+        self._body = None
+        self._etag = None
+        self._gzipped = None
+
+    @property
+    def body(self):
+        if self._body is None:
+            self._body = self.text.encode('utf-8')
+        return self._body
+
+    @property
+    def etag(self):
+        if self._etag is None:
+            self._etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+        return self._etag
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+# Serialized payloads keyed by name, re-encoded only when their version changes,
+# so serving a cached verse costs no JSON work at all
+class PayloadCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get_payload(self, key, version, build):
+        cached = self.entries.get(key)
+        if cached is not None and cached[0] == version:
+            CACHE_REQUESTS.inc('payload', 'hit')
+            return cached[1]
+        CACHE_REQUESTS.inc('payload', 'miss')
+        data = build()
+        payload = Payload(dumps(data), data)
+        self.entries[key] = (version, payload)
+        return payload
+
+    def get(self, key, version, build):
+        return self.get_payload(key, version, build).text
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+
+# Strong validators don't survive a change of encoding, so the gzip body gets its own ETag
+def gzip_etag(etag):
+    return etag[:-1] + '-gzip"'
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
+
+# Whether an Accept-Encoding header allows gzip, by its own entry or else by '*', honouring q=0
+def accepts_gzip(accept_encoding):
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+    return weights.get('gzip', weights.get('*', 0)) > 0
+
+# Cacheable JSON response for a GET: strong ETag, Cache-Control, 304 on a match, gzip if accepted
+def json_http_response(request, payload, max_age):
+    use_gzip = accepts_gzip(request.headers.get('Accept-Encoding', '')) and len(payload.body) >= GZIP_MIN_SIZE
+    etag = gzip_etag(payload.etag) if use_gzip else payload.etag
+    headers = {'ETag': etag, 'Cache-Control': f'public, max-age={max(0, int(max_age))}', 'Vary': 'Accept-Encoding'}
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return web.Response(status=304, headers=headers)
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+        return web.Response(body=payload.gzipped, content_type='application/json', charset='utf-8', headers=headers)
+    return web.Response(body=payload.body, content_type='application/json', charset='utf-8', headers=headers)
+
+HTTP_MAX_AGE = 300  # Browser cache lifetime for live data (VOTD, update status)
+ARCHIVE_MAX_AGE = 24 * 60 * 60  # Past verses don't change
+
+# Metrics: a small in-process registry exported at /metrics in the Prometheus text format.
+# Everything is recorded on the event loop, so recording is a dict lookup and an add, no locks.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def format_labels(names, values, extra=''):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Base for all metric types. collect, if given, returns {label values tuple: value} at scrape
+# time, for numbers that already live elsewhere (executor stats, connection counts).
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, description, labels=(), collect=None):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.collect = collect
+        self.values = {}
+
+    def samples(self):
+        values = self.collect() if self.collect else self.values
+        for label_values, value in values.items():
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+    def render(self):
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        series = self.values.get(label_values)
+        if series is None:
+            # Per-bucket counts (the last one is +Inf), then sum and count
+            series = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for label_values, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                yield f"{self.name}_bucket{format_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, label_values)} {total}"
+            yield f"{self.name}_count{format_labels(self.labels, label_values)} {count}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, description, labels=(), collect=None):
+        return self.register(Counter(name, description, labels, collect))
+
+    def gauge(self, name, description, labels=(), collect=None):
+        return self.register(Gauge(name, description, labels, collect))
+
+    def histogram(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Decorator recording how long an async function takes into histogram under label_values
+def timed(histogram, *label_values):
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, *label_values)
+        return wrapper
+    return decorate
+
+METRICS = MetricsRegistry()
+HANDLER_SECONDS = METRICS.histogram('youversion_handler_seconds', "Time spent serving a request, by handler", ('handler',))
+CALL_SECONDS = METRICS.histogram('youversion_call_seconds', "Time taken by internal data functions", ('function',))
+UPSTREAM_SECONDS = METRICS.histogram('youversion_upstream_fetch_seconds', "Upstream VOTD page fetches, by HTTP status or error", ('status',))
+PARSE_SECONDS = METRICS.histogram('youversion_parse_seconds', "Time to parse a VOTD page, by parser strategy", ('strategy',))
+CACHE_REQUESTS = METRICS.counter('youversion_cache_requests_total', "Cache lookups, by cache and result (hit, stale or miss)", ('cache', 'result'))
+
+# Share of lookups answered from the cache, stale answers included
+def cache_hit_ratios():
+    totals = {}
+    for (cache, result), count in CACHE_REQUESTS.values.items():
+        served, total = totals.get(cache, (0, 0))
+        totals[cache] = (served + (count if result != 'miss' else 0), total + count)
+    return {(cache,): served / total for cache, (served, total) in totals.items() if total}
+
+METRICS.gauge('youversion_cache_hit_ratio', "Share of cache lookups answered without waiting on a fetch", ('cache',), collect=cache_hit_ratios)
+METRICS.gauge('youversion_executor_threads', "Blocking-call executor threads and queue, by state", ('state',),
+              collect=lambda: {(state,): stats[state] for stats in [Plugin.executor.stats()] for state in ('workers', 'queued', 'active')} if Plugin.executor else {})
+METRICS.counter('youversion_executor_calls_total', "Blocking calls finished, by result", ('result',),
+                collect=lambda: {('completed',): Plugin.executor.completed, ('timeout',): Plugin.executor.timeouts} if Plugin.executor else {})
+METRICS.gauge('youversion_ws_connections', "Open connections on the multiplexed /ws socket", collect=lambda: {(): len(Plugin.pubsub.connections)})
+METRICS.counter('youversion_log_records_dropped_total', "Log records not written, by reason", ('reason',),
+                collect=lambda: {('queue_full',): Plugin.log_handler.dropped, ('rate_limited',): Plugin.log_handler.filters[0].suppressed} if Plugin.log_handler else {})
+WS_DROPPED = METRICS.counter('youversion_ws_dropped_total', "WebSocket clients dropped for being too slow, by reason", ('reason',))
+
+# One client on the multiplexed /ws socket. Pushes go through a bounded queue drained by
+# its own writer task, so a slow client can never hold up a fan-out; it just gets dropped.
+WS_SEND_QUEUE = 16  # Pushes buffered per client before it counts as too slow
+WS_SEND_TIMEOUT = 10  # Seconds a single send may take before the client is dropped
+
+class Connection:
+    def __init__(self, ws):
+        self.ws = ws
+        self.topics = set()
+        self.queue = asyncio.Queue(maxsize=WS_SEND_QUEUE)
+        self.writer = asyncio.ensure_future(self._write())
+
+    async def _write(self):
+        try:
+            while True:
+                data = await self.queue.get()
+                await asyncio.wait_for(self.ws.send_str(data), WS_SEND_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError, RuntimeError) as e:
+            decky_plugin.logger.warning("Dropping slow WebSocket client: %r", e)
+            WS_DROPPED.inc('send_failed')
+            await self.ws.close()
+
+    # Queue data without waiting; returns False if the client is gone or too far behind
+    def push(self, data):
+        if self.ws.closed or self.writer.done():
+            return False
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            decky_plugin.logger.warning("Dropping WebSocket client with a full send buffer")
+            WS_DROPPED.inc('buffer_full')
+            return False
+
+    def close(self):
+        self.writer.cancel()
+        if not self.ws.closed:
+            asyncio.ensure_future(self.ws.close())
+
+# Registry of /ws connections and the topics they subscribed to
+class PubSub:
+    def __init__(self):
+        self.connections = set()
+        self.topics = {}
+
+    def register(self, conn):
+        self.connections.add(conn)
+
+    # Forget a connection entirely and close it
+    def unregister(self, conn):
+        self.connections.discard(conn)
+        for topic in list(conn.topics):
+            self.unsubscribe(topic, conn)
+        conn.close()
+
+    def subscribe(self, topic, conn):
+        self.topics.setdefault(topic, set()).add(conn)
+        conn.topics.add(topic)
+
+    def unsubscribe(self, topic, conn):
+        conn.topics.discard(topic)
+        subscribers = self.topics.get(topic)
+        if subscribers:
+            subscribers.discard(conn)
+            if not subscribers:
+                del self.topics[topic]
+
+    # data is an already serialized message; never waits on any client
+    def publish(self, topic, data):
+        subscribers = list(self.topics.get(topic, ()))
+        for conn in subscribers:
+            if not conn.push(data):
+                self.unregister(conn)
+        return len(subscribers)
+
+    # One fan-out over every connection; messages_for(conn) returns the serialized messages it gets
+    def broadcast(self, messages_for):
+        sent = 0
+        for conn in list(self.connections):
+            for data in messages_for(conn):
+                if not conn.push(data):
+                    self.unregister(conn)
+                    break
+                sent += 1
+        return sent
+
+def votd_topic(locale=DEFAULT_LOCALE, version=None):
+    return f"votd:{locale}:{version or ''}"
+
+UPDATE_TOPIC = 'update'
+WS_HEARTBEAT = 30  # Seconds between pings on the multiplexed socket
+BATCH_MAX_REQUESTS = 32  # Requests allowed in one batch message
+ROLLOVER_DELAY = 1  # Seconds past midnight, so date.today() has surely moved on
+SHUTDOWN_TIMEOUT = 5  # Seconds _unload gives in-flight requests and tasks before cutting them off
+
+# Owns everything _main starts: the server, background tasks and the resources they use.
+# shutdown() releases them in order, so a reload can bind the port again straight away.
+class Lifecycle:
+    def __init__(self):
+        self.runner = None
+        self.port = None  # TCP port actually bound
+        self.unix_path = None  # Unix socket actually bound
+        self.tasks = set()
+        self.websockets = weakref.WeakSet()
+        self.closers = []  # (name, func) to release on shutdown, run in reverse order
+        self.inflight = 0
+        self.idle = asyncio.Event()
+        self.stopped = asyncio.Event()
+        self.stopping = False
+
+    # Start a background task that shutdown() will cancel
+    def spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    # func may be sync or async
+    def on_shutdown(self, name, func):
+        self.closers.append((name, func))
+
+    def track_websocket(self, ws):
+        self.websockets.add(ws)
+        return ws
+
+    # Counts requests in flight so shutdown can wait for them, and turns new ones away once draining
+    def middleware(self):
+        @web.middleware
+        async def track_requests(request, handler):
+            if self.stopping:
+                raise web.HTTPServiceUnavailable()
+            self.inflight += 1
+            self.idle.clear()
+            try:
+                return await handler(request)
+            finally:
+                self.inflight -= 1
+                if not self.inflight:
+                    self.idle.set()
+        return track_requests
+
+    # Listen on TCP (when host is given) and/or a Unix socket (when unix_path is given)
+    async def start(self, app, host=None, port=SERVER_PORT, unix_path=None):
+        app.middlewares.append(self.middleware())
+        # No access log: a line per request is what made the log file grow; /metrics counts them instead
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        if unix_path:
+            try:
+                await web.UnixSite(self.runner, unix_path).start()
+                self.unix_path = unix_path
+                self.on_shutdown("Unix socket", lambda: os.path.exists(unix_path) and os.remove(unix_path))
+            except OSError as e:
+                decky_plugin.logger.error(f"Could not listen on {unix_path}: {e}")
+        if host:
+            self.port = await self.bind_tcp(host, port)
+
+    # Take port if it is free, else one of the next few, else whatever the OS hands out
+    async def bind_tcp(self, host, port, attempts=PORT_FALLBACK_ATTEMPTS):
+        for candidate in range(port, port + attempts):
+            site = web.TCPSite(self.runner, host, candidate)
+            try:
+                await site.start()
+                return candidate
+            except OSError as e:
+                await site.stop()
+                if e.errno != errno.EADDRINUSE:
+                    raise
+                decky_plugin.logger.warning(f"Port {candidate} is in use, trying the next one")
+        # An OS-picked port would differ per address family, so stick to IPv4 loopback
+        await web.TCPSite(self.runner, '127.0.0.1', 0).start()
+        return next(address[1] for address in self.runner.addresses if isinstance(address, tuple))
+
+    # Where the server can be reached, for the frontend and for SERVER_INFO_PATH
+    def endpoints(self):
+        return {'host': SERVER_HOST, 'port': self.port, 'unix_socket': self.unix_path}
+
+    # Returns once shutdown() has finished
+    async def wait(self):
+        await self.stopped.wait()
+
+    async def shutdown(self, timeout=SHUTDOWN_TIMEOUT):
+        if self.stopping:
+            await self.stopped.wait()
+            return
+        self.stopping = True
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+
+        if self.runner:
+            # Stop listening first, which frees the port
+            for site in list(self.runner.sites):
+                await site.stop()
+            # Sockets stay open until the client leaves, so close them rather than wait
+            await asyncio.gather(*(ws.close(code=aiohttp.WSCloseCode.GOING_AWAY, message=b"Plugin unloading") for ws in list(self.websockets)), return_exceptions=True)
+            if self.inflight:
+                try:
+                    await asyncio.wait_for(self.idle.wait(), max(0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    decky_plugin.logger.warning(f"Shutting down with {self.inflight} requests still in flight")
+            try:
+                await asyncio.wait_for(self.runner.cleanup(), max(1, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                decky_plugin.logger.warning("Timed out cleaning up the web server")
+            self.runner = None
+
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=max(0.1, deadline - loop.time()))
+
+        for name, func in reversed(self.closers):
+            try:
+                result = func()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                decky_plugin.logger.error(f"Error releasing {name} on shutdown: {e}")
+        self.closers = []
+        self.stopped.set()
 
 class Plugin:
-    votd_cache = {}  # Use a class-level variable to store cached data
-    update_cache = {}  # New variable to cache update info
+    http = None  # Shared fetcher (see create_fetcher), created in _main and closed in _unload
+    executor = None  # BlockingExecutor for all blocking I/O, created in _main and shut down in _unload
+    writer = None  # JsonWriter for the cache files, on top of executor; closed, not cleared, on unload
+    settings = {}
+    image_index = {}  # Remote image URL -> file name in IMAGE_CACHE_DIR, mirrored to IMAGE_INDEX_PATH
+    votd_archive = {}  # Archived verses by votd_cache_key(), mirrored to VOTD_ARCHIVE_PATH
+    votd_cache = {}  # VOTD entries keyed by votd_cache_key(), mirrored to VOTD_CACHE_PATH
+    update_cache = {}  # Last update info as {'fetched_at', 'data'}, mirrored to UPDATE_CACHE_PATH
+    local_version = None  # Version from the installed package.json, read once in _main
+    log_handler = None  # AsyncLogHandler in front of the plugin log, installed in _main
+    lifecycle = None  # Lifecycle owning the server, tasks and resources, created in _main
+    votd_tracked = {}  # (locale, version) pairs with a background refresher -> last requested, None if configured
+    upstream_slots = None  # asyncio.Semaphore enforcing max_concurrent_fetches
+    inflight = SingleFlight()  # Deduplicates concurrent VOTD and update fetches
+    pubsub = PubSub()  # Subscriptions made over the multiplexed /ws socket
+    payloads = PayloadCache()  # Pre-serialized VOTD and update payloads
+    image_generation = 0  # Bumped whenever image_index changes, invalidating serialized VOTD payloads
+    image_failures = {}  # Remote image URL -> (retry_at, failures) for downloads that failed
+    votd_failures = {}  # (locale, version) -> (retry_at, failures) for verse fetches that failed
+    github_cache = {}  # Last GitHub package.json with its validators, for conditional requests
 
     async def _main(self):
+        Plugin.lifecycle = Lifecycle()
+        # Registered first so it runs last, after everything else has logged its shutdown
+        Plugin.log_handler, uninstall_logging = install_async_logging(decky_plugin.logger)
+        Plugin.lifecycle.on_shutdown("log writer", uninstall_logging)
         decky_plugin.logger.info("This is _main being called")
 
+        # Warm the VOTD cache from disk so the first request doesn't need the network
+        Plugin.votd_cache = load_votd_cache()
+        Plugin.votd_archive = load_votd_archive()
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        Plugin.image_index = read_json_file(IMAGE_INDEX_PATH, {})
+        decky_plugin.logger.info(f"Loaded {len(Plugin.votd_cache)} VOTD cache entries and {len(Plugin.votd_archive)} archived verses from disk")
+
+        # One pooled session for every outbound fetch, so refreshes reuse warm connections
+        Plugin.settings = load_settings()
+        Plugin.executor = BlockingExecutor(Plugin.settings['executor_workers'], Plugin.settings['executor_timeout'])
+        Plugin.writer = JsonWriter(Plugin.executor)
+        Plugin.http = create_fetcher(Plugin.settings['http_engine'], Plugin.executor)
+        Plugin.upstream_slots = asyncio.Semaphore(Plugin.settings['max_concurrent_fetches'])
+        # Released in reverse: in-flight fetches are cancelled, caches flushed, then pools closed
+        Plugin.lifecycle.on_shutdown("executor", Plugin.executor.shutdown)
+        Plugin.lifecycle.on_shutdown("HTTP pools", Plugin.http.close)
+
+        # Restore the last update check, with its GitHub validators, so a restart needs no network
+        update_state = read_json_file(UPDATE_CACHE_PATH, {})
+        Plugin.update_cache = update_state.get('update', {})
+        Plugin.github_cache = update_state.get('github', {})
+
         # Function to fetch GitHub package.json
         async def fetch_github_version():
-            github_url = "https://raw.githubusercontent.com/moraroy/YouVersion-Bible/main/package.json"
+            github_url = GITHUB_PACKAGE_URL
             decky_plugin.logger.info(f"Fetching GitHub version from {github_url}")
-            loop = asyncio.get_event_loop()
+            cached = Plugin.github_cache
+            headers = conditional_headers(cached.get('validators')) if cached.get('data') else {}
             try:
-                response = await loop.run_in_executor(None, requests.get, github_url)
-                response.raise_for_status()
+                result = await Plugin.http.get(github_url, headers=headers)
+                if result.status == 304:
+                    decky_plugin.logger.info("GitHub version not modified, reusing cached package.json")
+                    cached['fetched_at'] = time.time()
+                    return cached['data']
                 decky_plugin.logger.info("Successfully fetched GitHub version")
-                return response.json()  # This will return the parsed JSON directly
-            except requests.exceptions.RequestException as e:
-                decky_plugin.logger.error(f"Error fetching GitHub version: {e}")
+                data = json.loads(result.body)
+                Plugin.github_cache = {'fetched_at': time.time(), 'data': data, 'validators': result.validators}
+                return data
+            except (FetchError, asyncio.TimeoutError, ValueError) as e:
+                decky_plugin.logger.error(f"Error fetching GitHub version: {e!r}")
                 return None
 
         # Function to read the local package.json
@@ -59,12 +1228,34 @@ class Plugin:
                 decky_plugin.logger.error(f"Failed to parse {local_package_path}")
                 return None
 
-        # Compare versions
-        async def compare_versions():
-            if Plugin.update_cache:  # Check if we have cached update info
-                decky_plugin.logger.info("Returning cached update information.")
-                return Plugin.update_cache
+        # Answer from the cached update info only; the background poll is what keeps it current.
+        # Returns a serialized Payload, encoded once per cached entry.
+        @timed(CALL_SECONDS, 'compare_versions_payload')
+        async def compare_versions_payload():
+            entry = Plugin.update_cache
+            if not entry:
+                # First run and the poll hasn't finished yet
+                CACHE_REQUESTS.inc('update', 'miss')
+                checking = {"status": "Checking", "local_version": Plugin.local_version, "github_version": None, "cache": None}
+                return Payload(dumps(checking), checking)
+            stale = time.time() - entry['fetched_at'] >= Plugin.settings['update_check_interval']
+            CACHE_REQUESTS.inc('update', 'stale' if stale else 'hit')
+            decky_plugin.logger.debug("Returning cached update information.")
+            return Plugin.payloads.get_payload('update', (entry['fetched_at'], stale, Plugin.local_version), lambda: dict(entry['data'], cache=cache_metadata(entry, stale)))
+
+        async def compare_versions_json():
+            return (await compare_versions_payload()).text
+
+        # Concurrent callers share a single check
+        async def refresh_update():
+            return await Plugin.inflight.do('check_update', check_versions)
 
+        def update_status(local_version, github_version):
+            if local_version == github_version:
+                return {"status": "Up-to-date", "local_version": local_version, "github_version": github_version}
+            return {"status": "Update available", "local_version": local_version, "github_version": github_version}
+
+        async def check_versions():
             local_version = await fetch_local_version()
             github_data = await fetch_github_version()
 
@@ -77,152 +1268,728 @@ class Plugin:
 
             decky_plugin.logger.info(f"Local Version: {local_version}, GitHub Version: {github_version}")
 
-            if local_version == github_version:
-                update_info = {"status": "Up-to-date", "local_version": local_version, "github_version": github_version}
-            else:
-                update_info = {"status": "Update available", "local_version": local_version, "github_version": github_version}
+            update_info = update_status(local_version, github_version)
+            changed = Plugin.update_cache.get('data') != update_info
 
-            Plugin.update_cache = update_info  # Cache the update info
-            return update_info
+            # Cache the update info, and persist it together with the GitHub validators
+            Plugin.update_cache = {'fetched_at': time.time(), 'data': update_info}
+            Plugin.writer.write(UPDATE_CACHE_PATH, {'update': Plugin.update_cache, 'github': Plugin.github_cache})
+            if changed:
+                Plugin.lifecycle.spawn(publish(UPDATE_TOPIC, compare_versions_json()))
+            return Plugin.update_cache
 
         # WebSocket handler to check for updates
+        @timed(HANDLER_SECONDS, 'check_update')
         async def handle_check_update(request):
-            ws = web.WebSocketResponse()
+            ws = Plugin.lifecycle.track_websocket(web.WebSocketResponse())
             await ws.prepare(request)
 
             try:
                 # Fetch and compare the versions
-                version_info = await compare_versions()
-                await ws.send_json(version_info)
+                await ws.send_str(await compare_versions_json())
             except Exception as e:
-                decky_plugin.logger.error(f"Error handling update check: {e}")
+                decky_plugin.logger.error("Error handling update check: %s", e)
                 await ws.send_json({"error": "Internal error"})
             finally:
                 await ws.close()
             return ws
 
         # WebSocket handler to send VOTD data
+        # ?locale=es&version=149 picks one verse; ?locales=en,es:149 sends one message per verse as each is ready
+        @timed(HANDLER_SECONDS, 'votd_ws')
         async def handle_votd_ws(request):
-            ws = web.WebSocketResponse()
+            ws = Plugin.lifecycle.track_websocket(web.WebSocketResponse())
             await ws.prepare(request)
 
             try:
-                # Fetch VOTD data and send it over WebSocket
-                votd_data = await fetch_votd()
-                if votd_data:
-                    await ws.send_json(votd_data)
-                else:
-                    await ws.send_json({"error": "Failed to fetch data"})
+                try:
+                    if 'locales' in request.query:
+                        keys = parse_votd_keys(request.query['locales'], VOTD_MAX_TRACKED)
+                    else:
+                        keys = [check_votd_key(request.query.get('locale', DEFAULT_LOCALE), request.query.get('version'))]
+                except ValueError as e:
+                    await ws.send_json({"error": str(e)})
+                    return ws
+
+                # Fetch VOTD data and send it over WebSocket; a slow locale never holds up the others
+                for votd_data in asyncio.as_completed([fetch_votd_json(locale, version) for locale, version in keys]):
+                    await ws.send_str(await votd_data)
             except Exception as e:
-                decky_plugin.logger.error(f"Error handling WebSocket: {e}")
+                decky_plugin.logger.error("Error handling WebSocket: %s", e)
                 await ws.send_json({"error": "Internal error"})
             finally:
                 await ws.close()
             return ws
 
         # Define the fetch_data function using requests inside _main
-        async def fetch_data():
-            URL = "https://www.bible.com/en/verse-of-the-day"
-            decky_plugin.logger.info(f"Fetching data from {URL}")
-
-            loop = asyncio.get_event_loop()
-            try:
-                # Use requests.get inside run_in_executor to run it in a separate thread
-                response = await loop.run_in_executor(None, requests.get, URL)
-                response.raise_for_status()  # Will raise an error for 4xx/5xx responses
-                decky_plugin.logger.info(f"Successfully fetched data from {URL}")
-                return response.text
-            except requests.exceptions.RequestException as e:
-                decky_plugin.logger.error(f"Error fetching data: {e}")
+        async def fetch_data(validators=None, stream=VOTD_STREAMING, day=None, locale=DEFAULT_LOCALE, version=None):
+            URL = VOTD_URL.format(locale=locale)
+            params = {}
+            if version:
+                params['version'] = version
+            if day:
+                params['day'] = day.timetuple().tm_yday  # Day of the current year, see first_archive_day()
+            decky_plugin.logger.info("Fetching data from %s %s", URL, params or '')
+
+            try:
+                # Every locale shares one global cap on upstream fetches in flight
+                async with Plugin.upstream_slots:
+                    start = time.perf_counter()
+                    try:
+                        result = await Plugin.http.get(URL, headers=conditional_headers(validators), params=params or None, stream=stream)
+                    except BaseException:
+                        UPSTREAM_SECONDS.observe(time.perf_counter() - start, 'error')
+                        raise
+                    UPSTREAM_SECONDS.observe(time.perf_counter() - start, str(result.status))
+                if result.status == 304:
+                    decky_plugin.logger.info("%s not modified since last fetch", URL)
+                    # A 304 may leave out validators, so keep the ones we sent unless they were replaced
+                    old = validators or {}
+                    return result._replace(validators={k: v or old.get(k) for k, v in result.validators.items()})
+                decky_plugin.logger.info("Successfully fetched data from %s", URL)
+                return result
+            except (FetchError, asyncio.TimeoutError) as e:
+                decky_plugin.logger.error("Error fetching data: %r", e)
                 return None
 
         # Define the fetch_votd function to process the fetched data
-        async def fetch_votd():
-            # Check if we already have VOTD data in cache
-            if Plugin.votd_cache:
-                decky_plugin.logger.info("Returning cached VOTD data.")
-                return Plugin.votd_cache
-
-            # If cache is empty, fetch the data
-            data = await fetch_data()
-            if data:
-                html_content = data
-                # Look for the __NEXT_DATA__ script tag
-                next_data_match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.+?)</script>', html_content, re.S)
-                if next_data_match:
-                    json_data = next_data_match.group(1)
-                    json_obj = json.loads(json_data)
-                    verse = json_obj['props']['pageProps']['verses'][0]['content'].replace('\n', ' ')
-                    reference = json_obj['props']['pageProps']['verses'][0]['reference']['human']
-                    version = json_obj['props']['pageProps']['versionData']['abbreviation']
-
-                    image_urls = re.findall(r'<a class="block[^>]*><img src="([^"]+)"', html_content)
-                    image_array = [f"https://www.bible.com{src}" for src in image_urls]
-
-                    # Cache the fetched data inside the Plugin class
-                    Plugin.votd_cache = {
-                        'citation': reference,
-                        'passage': verse,
-                        'images': image_array,
-                        'version': version
-                    }
-
-                    decky_plugin.logger.info("Fetched and cached new Verse of the Day")
-                    return Plugin.votd_cache
-                else:
-                    decky_plugin.logger.warning("Using the old way to extract data.")
-                    verses_array = []
-                    citations_array = []
-                    image_array = []
-
-                    verses_matches = re.findall(r'<a class="text-text-light w-full no-underline"[^>]*>(.+?)</a>', html_content, re.S)
-                    citations_matches = re.findall(r'<p class="text-gray-25">(.+?)</p>', html_content, re.S)
-                    images_matches = re.findall(r'<a class="block[^>]*><img src="([^"]+)"', html_content)
-
-                    for citation in citations_matches:
-                        citation_text = citation.strip()
-                        version = citation_text[-4:].replace('(', '').replace(')', '')
-                        citation_text = citation_text[:-6]
-                        citations_array.append(citation_text)
-                        decky_plugin.logger.info(f"Citation: {citation_text}")
-
-                    for verse in verses_matches:
-                        unformatted_verse = re.sub(r'\n', ' ', verse.strip())
-                        verses_array.append(unformatted_verse)
-                        decky_plugin.logger.info(f"Verse: {unformatted_verse}")
-
-                    image_array = [f"https://www.bible.com{src}" for src in images_matches]
-                    decky_plugin.logger.info(f"Images: {image_array}")
-
-                    # Cache the data even when fetched with the old way
-                    Plugin.votd_cache = {
-                        'citation': citations_array[0] if citations_array else '',
-                        'passage': verses_array[0] if verses_array else '',
-                        'images': image_array,
-                        'version': version
-                    }
-
-                    return Plugin.votd_cache
+        # Store a freshly parsed verse under today's key and persist the cache
+        def cache_votd(key, votd, validators=None):
+            entries = dict(Plugin.votd_cache)
+            entries[key] = {'fetched_at': time.time(), 'data': votd, 'validators': validators or {}}
+            # Pairs nobody keeps fresh anymore don't keep a fallback on disk
+            entries = prune_votd_entries(entries, Plugin.votd_tracked)
+            Plugin.votd_cache = entries
+            Plugin.writer.write(VOTD_CACHE_PATH, entries)
+            return entries[key]
+
+        # Answer from the cache straight away; stale entries get refreshed in the background.
+        # Returns (entry, stale), or (None, False) if nothing could be fetched.
+        async def current_votd(locale=DEFAULT_LOCALE, version=None):
+            entry, stale = find_votd_entry(Plugin.votd_cache, locale, version)
+            CACHE_REQUESTS.inc('votd', 'miss' if entry is None else 'stale' if stale else 'hit')
+            if entry is None:
+                # Nothing to serve yet, so this caller has to wait for the fetch, unless it just failed
+                if not votd_backing_off(locale, version):
+                    entry = await refresh_votd(locale, version)
+                stale = False
+            elif stale and ('votd', locale, version) not in Plugin.inflight.calls and not votd_backing_off(locale, version):
+                Plugin.lifecycle.spawn(refresh_votd(locale, version))
+            if entry is not None:
+                track_votd(locale, version)  # Only pairs upstream actually serves get a refresher
+            return entry, stale
+
+        # The payload clients get, tagged with the locale/version it answers
+        def votd_payload(entry, stale, locale, version):
+            return dict(entry['data'], images=localize_images(entry['data']['images']), cache=cache_metadata(entry, stale), locale=locale, requested_version=version)
+
+        # Today's verse as a serialized Payload, encoded once per entry/staleness/image-cache state;
+        # payload.data is the same verse as a dict. Returns None if nothing could be fetched.
+        @timed(CALL_SECONDS, 'fetch_votd_payload')
+        async def fetch_votd_payload(locale=DEFAULT_LOCALE, version=None):
+            entry, stale = await current_votd(locale, version)
+            if entry is None:
+                return None
+            decky_plugin.logger.debug("Returning cached VOTD data.")
+            version_key = (entry['fetched_at'], stale, Plugin.image_generation)
+            return Plugin.payloads.get_payload(('votd', locale, version), version_key, lambda: votd_payload(entry, stale, locale, version))
+
+        async def fetch_votd_json(locale=DEFAULT_LOCALE, version=None):
+            payload = await fetch_votd_payload(locale, version)
+            if payload is None:
+                return dumps({"error": "Failed to fetch data", "locale": locale, "requested_version": version})
+            return payload.text
+
+        # Concurrent callers for the same verse share one fetch and parse
+        # notify=False leaves telling subscribers to the caller, as the midnight rollover does
+        async def refresh_votd(locale=DEFAULT_LOCALE, version=None, notify=True):
+            return await Plugin.inflight.do(('votd', locale, version), load_votd, locale, version, notify)
+
+        async def load_votd(locale, version, notify=True):
+            try:
+                entry = await fetch_and_parse_votd(locale, version, notify)
+            except VotdParseError as e:
+                decky_plugin.logger.error("Failed to parse the verse of the day: %s", e)
+                entry = None
+            record_votd_result((locale, version), entry is not None)
+            return entry
+
+        # Requests don't start a fetch while the last one's failure is in backoff, so a failing
+        # upstream isn't scraped again on every request
+        def votd_backing_off(locale, version):
+            failure = Plugin.votd_failures.get((locale, version))
+            return failure is not None and failure[0] > time.time()
+
+        def record_votd_result(key, ok):
+            if ok:
+                Plugin.votd_failures.pop(key, None)
+                return
+            failures = Plugin.votd_failures.pop(key, (0, 0))[1] + 1
+            if len(Plugin.votd_failures) >= VOTD_FAILURES_MAX:
+                del Plugin.votd_failures[next(iter(Plugin.votd_failures))]  # Oldest failure first
+            delay = min(REFRESH_BACKOFF_MAX, REFRESH_BACKOFF_BASE * 2 ** (failures - 1))
+            Plugin.votd_failures[key] = (time.time() + delay, failures)
+
+        # Run the page through the parser registry; raises VotdParseError
+        def parse_votd(result):
+            start = time.perf_counter()
+            try:
+                votd, strategy = parse_votd_page(result.body, result.next_data, decky_plugin.logger)
+            except VotdParseError:
+                PARSE_SECONDS.observe(time.perf_counter() - start, 'failed')
+                raise
+            PARSE_SECONDS.observe(time.perf_counter() - start, strategy)
+            if strategy == 'legacy':
+                decky_plugin.logger.warning("Using the old way to extract data.")
+            return votd
+
+        async def fetch_and_parse_votd(locale, version, notify=True):
+            # Revalidate today's entry if we have one, otherwise fetch the page outright
+            key = votd_cache_key(locale, version)
+            entry = Plugin.votd_cache.get(key)
+            if entry and not votd_entry_fresh(key, entry):
+                entry = None
+            result = await fetch_data(entry['validators'] if entry else None, locale=locale, version=version)
+            if result and result.status == 304 and entry:
+                # Unchanged upstream: bump the timestamp without re-downloading or re-parsing
+                return cache_votd(key, entry['data'], result.validators)
+            if result and result.body:
+                # Cache the fetched data inside the Plugin class and on disk, and archive it
+                votd = parse_votd(result)
+                previous, _ = find_votd_entry(Plugin.votd_cache, locale, version)
+                entry = cache_votd(key, votd, result.validators)
+                archive_votd(key, votd)
+                Plugin.lifecycle.spawn(cache_images(votd['images']))
+                decky_plugin.logger.info("Fetched and cached new Verse of the Day")
+                if notify and (previous is None or previous['data'] != votd):
+                    Plugin.lifecycle.spawn(publish(votd_topic(locale, version), fetch_votd_json(locale, version)))
+                return entry
 
             decky_plugin.logger.error("Failed to fetch the verse of the day.")
-            return {}
+            return None
+
+        # When a verse is next due: shortly before it goes stale. The day boundary itself is
+        # handled by rollover_at_midnight; if that refresh fails the entry reads as stale here.
+        def votd_due_in(locale=DEFAULT_LOCALE, version=None):
+            entry, stale = find_votd_entry(Plugin.votd_cache, locale, version)
+            if entry is None or stale:
+                return 0
+            return entry['fetched_at'] + VOTD_REVALIDATE_AFTER - REFRESH_AHEAD - time.time()
+
+        # At each local midnight: refresh every tracked verse once, then tell every open /ws
+        # client in a single fan-out. Subscribers get their topics, everyone else the default verse.
+        async def rollover_at_midnight():
+            rolled_over = datetime.date.today()
+            while True:
+                # Short slices, so a suspend over midnight still rolls over soon after resume
+                await asyncio.sleep(min(WALL_CLOCK_SLICE, seconds_until_midnight() + ROLLOVER_DELAY))
+                if datetime.date.today() == rolled_over:
+                    continue
+                rolled_over = datetime.date.today()
+                try:
+                    await roll_over()
+                except Exception as e:
+                    decky_plugin.logger.error(f"Day rollover failed: {e}")
+
+        async def roll_over():
+            keys = list(Plugin.votd_tracked)
+            results = await asyncio.gather(*(refresh_votd(locale, version, notify=False) for locale, version in keys), return_exceptions=True)
+            for (locale, version), result in zip(keys, results):
+                if isinstance(result, Exception):
+                    decky_plugin.logger.error(f"Rollover refresh of {locale}/{version or 'default'} failed: {result}")
+
+            messages = {}
+            for locale, version in keys:
+                entry, stale = find_votd_entry(Plugin.votd_cache, locale, version)
+                if entry is None or stale:
+                    continue  # Refresh failed; keep_fresh retries and pushes once it lands
+                topic = votd_topic(locale, version)
+                messages[topic] = envelope({"type": "push", "topic": topic}, await fetch_votd_json(locale, version))
+            default_topic = votd_topic()
+
+            def messages_for(conn):
+                topics = [topic for topic in conn.topics if topic in messages]
+                if not topics and not any(topic.startswith('votd:') for topic in conn.topics) and default_topic in messages:
+                    topics = [default_topic]
+                return [messages[topic] for topic in topics]
+
+            sent = Plugin.pubsub.broadcast(messages_for)
+            decky_plugin.logger.info(f"Day rolled over, refreshed {len(messages)}/{len(keys)} verses and sent {sent} pushes")
+
+        # Give a locale/version its own background refresher the first time it is served.
+        # Configured pairs keep theirs; requested ones free the slot once unused or failing.
+        def track_votd(locale=DEFAULT_LOCALE, version=None, configured=False):
+            key = (locale, version)
+            if key in Plugin.votd_tracked:
+                if Plugin.votd_tracked[key] is not None:
+                    Plugin.votd_tracked[key] = time.time()
+                return
+            if len(Plugin.votd_tracked) >= VOTD_MAX_TRACKED:
+                return
+            Plugin.votd_tracked[key] = None if configured else time.time()
+
+            async def refresh():
+                return await refresh_votd(locale, version) is not None
+
+            def wanted(failures):
+                last_requested = Plugin.votd_tracked.get(key, 0)
+                if last_requested is None:
+                    return True
+                if failures >= VOTD_TRACKED_MAX_FAILURES:
+                    return False
+                return votd_topic(locale, version) in Plugin.pubsub.topics or time.time() - last_requested < VOTD_TRACKED_IDLE
+
+            async def refresh_while_wanted():
+                await keep_fresh(name, refresh, lambda: votd_due_in(locale, version), wanted)
+                Plugin.votd_tracked.pop(key, None)
+                Plugin.payloads.discard(('votd', locale, version))
+                decky_plugin.logger.info(f"Stopped refreshing {name}, it is no longer requested or keeps failing")
+
+            name = f"VOTD {locale}" + (f":{version}" if version else "")
+            Plugin.lifecycle.spawn(refresh_while_wanted())
+
+        def update_due_in():
+            if not Plugin.update_cache:
+                return 0
+            return Plugin.update_cache['fetched_at'] + Plugin.settings['update_check_interval'] - time.time()
+
+        async def refresh_update_info():
+            return 'error' not in await refresh_update()
+
+        # Point images at the local cache where we have them, and queue downloads for the rest
+        # unless download=False
+        def localize_images(urls, download=True):
+            images = []
+            missing = []
+            for url in urls:
+                name = Plugin.image_index.get(url)
+                # Local URLs need the TCP listener; over the Unix socket alone, link upstream
+                if name and Plugin.lifecycle.port:
+                    images.append(local_image_url(name, Plugin.lifecycle.port))
+                else:
+                    images.append(url)
+                    if download and not name and image_download_due(url):
+                        missing.append(url)
+            if missing:
+                Plugin.lifecycle.spawn(cache_images(missing))
+            return images
+
+        # Not cached yet, not already downloading, and not in backoff after a failure
+        def image_download_due(url):
+            if ('image', url) in Plugin.inflight.calls:
+                return False
+            failure = Plugin.image_failures.get(url)
+            return failure is None or failure[0] <= time.time()
+
+        async def cache_images(urls):
+            before = dict(Plugin.image_index)
+            await asyncio.gather(*(Plugin.inflight.do(('image', url), download_image, url) for url in urls))
+            evicted = evict_images(Plugin.image_index)
+            if evicted:
+                decky_plugin.logger.info(f"Evicted {len(evicted)} cached images")
+            # Only a real change invalidates the serialized payloads and rewrites the index
+            if Plugin.image_index != before:
+                Plugin.image_generation += 1
+                Plugin.writer.write(IMAGE_INDEX_PATH, dict(Plugin.image_index))
+
+        async def download_image(url):
+            if url in Plugin.image_index:
+                return Plugin.image_index[url]
+
+            def store(content, name):
+                path = os.path.join(IMAGE_CACHE_DIR, name)
+                # Same content means same name, so an existing file can be reused as is
+                if not os.path.exists(path):
+                    with open(f"{path}.tmp", "wb") as file:
+                        file.write(content)
+                    os.replace(f"{path}.tmp", path)
+
+            try:
+                # Verses cached before the parser unescaped src attributes still carry &amp;
+                result = await Plugin.http.get(html.unescape(url))
+                name = image_file_name(result.body, result.content_type, url)
+                await Plugin.executor.run(store, result.body, name)
+            except (FetchError, OSError, asyncio.TimeoutError) as e:
+                failures = Plugin.image_failures.get(url, (0, 0))[1] + 1
+                delay = min(IMAGE_RETRY_MAX, IMAGE_RETRY_BASE * 2 ** (failures - 1))
+                Plugin.image_failures[url] = (time.time() + delay, failures)
+                decky_plugin.logger.error("Error caching image %s, retrying in %ds: %s", url, delay, e)
+                return None
+            Plugin.image_failures.pop(url, None)
+            Plugin.image_index[url] = name
+            return name
+
+        # GET /images/{name}: cached image, sent with sendfile and long-lived cache headers
+        @timed(HANDLER_SECONDS, 'image')
+        async def handle_image(request):
+            name = request.match_info['name']
+            path = os.path.join(IMAGE_CACHE_DIR, name)
+            if not IMAGE_NAME_RE.match(name) or not os.path.isfile(path):
+                raise web.HTTPNotFound()
+            try:
+                os.utime(path)  # Mark as recently used for eviction
+            except OSError:
+                pass
+            return web.FileResponse(path, headers={'Cache-Control': IMAGE_CACHE_CONTROL})
+
+        # Record a verse in the archive; save=False lets backfills write the file once at the end
+        def archive_votd(key, votd, save=True):
+            Plugin.votd_archive[key] = votd
+            if save:
+                Plugin.writer.write(VOTD_ARCHIVE_PATH, dict(Plugin.votd_archive))
+
+        # Archived verse for a past day, scraping and archiving it on a miss
+        async def fetch_archived_votd(day, locale=DEFAULT_LOCALE, version=None, save=True):
+            key = votd_cache_key(locale, version, day)
+            if key in Plugin.votd_archive:
+                return Plugin.votd_archive[key]
+            if day < first_archive_day():
+                return None  # Day of year would fetch this year's verse instead
+            return await Plugin.inflight.do(('archive', key), scrape_past_votd, key, day, locale, version, save)
+
+        async def scrape_past_votd(key, day, locale, version, save):
+            result = await fetch_data(day=day, locale=locale, version=version)
+            if not result or not result.body:
+                return None
+            try:
+                votd = parse_votd(result)
+            except VotdParseError as e:
+                decky_plugin.logger.error("Failed to parse the verse of the day for %s: %s", day, e)
+                return None
+            archive_votd(key, votd, save)
+            return votd
+
+        # Fetch every missing day in [start, end] with at most `concurrency` scrapes in flight
+        async def backfill_votd(start, end, locale=DEFAULT_LOCALE, version=None, concurrency=VOTD_BACKFILL_CONCURRENCY):
+            missing = [day for day in date_range(start, end) if votd_cache_key(locale, version, day) not in Plugin.votd_archive]
+            if not missing:
+                return 0
+            decky_plugin.logger.info(f"Backfilling {len(missing)} verses between {start} and {end}")
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def backfill_day(day):
+                async with semaphore:
+                    return await fetch_archived_votd(day, locale, version, save=False)
+
+            results = await asyncio.gather(*(backfill_day(day) for day in missing))
+            Plugin.writer.write(VOTD_ARCHIVE_PATH, dict(Plugin.votd_archive))
+            filled = sum(1 for votd in results if votd)
+            decky_plugin.logger.info(f"Backfilled {filled}/{len(missing)} verses")
+            return filled
+
+        # Optional ?locale=...&version=... on the archive routes; raises ValueError
+        def votd_key_query(request):
+            return check_votd_key(request.query.get('locale', DEFAULT_LOCALE), request.query.get('version'))
+
+        def votd_range_query(request):
+            if 'start' not in request.query:
+                raise ValueError("start is required")
+            start = parse_votd_date(request.query['start'])
+            end = parse_votd_date(request.query.get('end', datetime.date.today().isoformat()))
+            if end < start:
+                raise ValueError("end is before start")
+            return start, end
+
+        # GET /votd?date=YYYY-MM-DD: one archived verse (today if no date is given)
+        @timed(HANDLER_SECONDS, 'votd_by_date')
+        async def handle_votd_by_date(request):
+            try:
+                day = parse_votd_date(request.query['date']) if 'date' in request.query else datetime.date.today()
+                locale, version = votd_key_query(request)
+            except ValueError as e:
+                return web.json_response({"error": str(e)}, status=400)
+            if day == datetime.date.today():
+                # Today's verse comes from the live cache, images already localized
+                payload = await fetch_votd_payload(locale, version)
+                votd = payload.data if payload else None
+                max_age = min(HTTP_MAX_AGE, seconds_until_midnight())
+            else:
+                votd = await fetch_archived_votd(day, locale, version)
+                if votd:
+                    votd = dict(votd, images=localize_images(votd['images']))
+                max_age = ARCHIVE_MAX_AGE
+            if not votd:
+                return web.json_response({"error": "Failed to fetch data"}, status=502)
+            return json_http_response(request, Payload(dumps(dict(votd, date=day.isoformat()))), max_age)
+
+        # GET /votd/range?start=YYYY-MM-DD&end=YYYY-MM-DD: archived verses only, missing days are listed
+        @timed(HANDLER_SECONDS, 'votd_range')
+        async def handle_votd_range(request):
+            try:
+                start, end = votd_range_query(request)
+                locale, version = votd_key_query(request)
+            except ValueError as e:
+                return web.json_response({"error": f"Invalid date range: {e}"}, status=400)
+            verses = []
+            missing = []
+            for day in date_range(start, end):
+                votd = Plugin.votd_archive.get(votd_cache_key(locale, version, day))
+                if votd:
+                    # A range spans up to a year of verses, far more images than the cache holds, so only
+                    # rewrite the ones already cached rather than downloading them all
+                    verses.append(dict(votd, images=localize_images(votd['images'], download=False), date=day.isoformat()))
+                else:
+                    missing.append(day.isoformat())
+            # Missing days may be backfilled at any time, so only cache briefly
+            return json_http_response(request, Payload(dumps({"verses": verses, "missing": missing})), HTTP_MAX_AGE)
+
+        # GET /api/votd?locale=&version=: today's verse, the same pre-serialized payload /ws sends
+        @timed(HANDLER_SECONDS, 'api_votd')
+        async def handle_api_votd(request):
+            try:
+                locale, version = votd_key_query(request)
+            except ValueError as e:
+                return web.json_response({"error": str(e)}, status=400)
+            payload = await fetch_votd_payload(locale, version)
+            if payload is None:
+                return web.json_response({"error": "Failed to fetch data"}, status=502)
+            return json_http_response(request, payload, min(HTTP_MAX_AGE, seconds_until_midnight()))
+
+        # GET /api/update: cached update status
+        @timed(HANDLER_SECONDS, 'api_update')
+        async def handle_api_update(request):
+            return json_http_response(request, await compare_versions_payload(), HTTP_MAX_AGE)
+
+        # POST /votd/backfill?start=...&end=...: start a backfill job and return right away
+        @timed(HANDLER_SECONDS, 'votd_backfill')
+        async def handle_votd_backfill(request):
+            try:
+                start, end = votd_range_query(request)
+                locale, version = votd_key_query(request)
+            except ValueError as e:
+                return web.json_response({"error": f"Invalid date range: {e}"}, status=400)
+            Plugin.lifecycle.spawn(backfill_votd(start, end, locale, version))
+            return web.json_response({"status": "Backfill started", "start": start.isoformat(), "end": end.isoformat()}, status=202)
+
+        # Push a change to everyone subscribed to the topic; payload is awaited only if someone listens
+        async def publish(topic, payload):
+            if not Plugin.pubsub.topics.get(topic):
+                payload.close()
+                return
+            Plugin.pubsub.publish(topic, envelope({"type": "push", "topic": topic}, await payload))
+
+        # Requests understood by /ws, each answering with the same serialized payload as its single-shot route
+        async def ws_votd(message):
+            locale, version = check_votd_key(message.get('locale', DEFAULT_LOCALE), message.get('version'))
+            return await fetch_votd_json(locale, version)
+
+        async def ws_check_update(message):
+            return await compare_versions_json()
+
+        ws_methods = {'votd': ws_votd, 'check_update': ws_check_update}
+
+        # Subscription topics, and the request that produces a topic's current value
+        def ws_topic(message):
+            if message.get('topic') == 'votd':
+                locale, version = check_votd_key(message.get('locale', DEFAULT_LOCALE), message.get('version'))
+                return votd_topic(locale, version), ws_votd
+            if message.get('topic') == UPDATE_TOPIC:
+                return UPDATE_TOPIC, ws_check_update
+            raise ValueError(f"Unknown topic {message.get('topic')!r}")
+
+        # Answer one request with its serialized reply. conn is None over HTTP, where there is
+        # nothing to push to, so only the plain queries in ws_methods are available there.
+        async def ws_reply(conn, message):
+            request_id = message.get('id')
+            kind = message.get('type')
+            start = time.perf_counter()
+            try:
+                if kind in ws_methods:
+                    reply = envelope({"id": request_id, "type": kind}, await ws_methods[kind](message))
+                elif kind in ('subscribe', 'unsubscribe') and conn is None:
+                    reply = dumps({"id": request_id, "error": "Subscriptions need the /ws socket"})
+                elif kind == 'subscribe':
+                    topic, current = ws_topic(message)
+                    Plugin.pubsub.subscribe(topic, conn)
+                    # Reply with the current value so the client needs no separate request
+                    reply = envelope({"id": request_id, "type": kind, "topic": topic}, await current(message))
+                elif kind == 'unsubscribe':
+                    topic, _ = ws_topic(message)
+                    Plugin.pubsub.unsubscribe(topic, conn)
+                    reply = dumps({"id": request_id, "type": kind, "topic": topic})
+                else:
+                    reply = dumps({"id": request_id, "error": f"Unknown request type {kind!r}"})
+            except ValueError as e:
+                reply = dumps({"id": request_id, "error": str(e)})
+            except Exception as e:
+                decky_plugin.logger.error("Error handling %s request: %s", kind, e)
+                reply = dumps({"id": request_id, "error": "Internal error"})
+            # Label by request type, but only the known ones so clients can't grow the series
+            known = kind in ws_methods or kind in ('subscribe', 'unsubscribe')
+            HANDLER_SECONDS.observe(time.perf_counter() - start, f"ws:{kind}" if known else "ws:unknown")
+            return reply
+
+        # The requests of a {"type": "batch", "requests": [...]} message; raises ValueError
+        def batch_requests(message):
+            requests = message.get('requests')
+            if not isinstance(requests, list) or not all(isinstance(item, dict) for item in requests):
+                raise ValueError("requests must be a list of objects")
+            if len(requests) > BATCH_MAX_REQUESTS:
+                raise ValueError(f"At most {BATCH_MAX_REQUESTS} requests per batch")
+            if any(item.get('type') == 'batch' for item in requests):
+                raise ValueError("Batches can't be nested")
+            return requests
+
+        # Run every request concurrently and yield each reply, tagged with that request's own id,
+        # as soon as it is ready
+        async def batch_replies(conn, requests):
+            for reply in asyncio.as_completed([ws_reply(conn, item) for item in requests]):
+                yield await reply
+
+        async def handle_ws_message(conn, message):
+            if message.get('type') != 'batch':
+                reply = await ws_reply(conn, message)
+            else:
+                # Sub-replies stream out first; the batch's own reply marks the end
+                start = time.perf_counter()
+                try:
+                    requests = batch_requests(message)
+                except ValueError as e:
+                    reply = dumps({"id": message.get('id'), "error": str(e)})
+                else:
+                    async for item in batch_replies(conn, requests):
+                        if conn.ws.closed:
+                            return
+                        await conn.ws.send_str(item)
+                    reply = dumps({"id": message.get('id'), "type": "batch", "data": {"count": len(requests)}})
+                HANDLER_SECONDS.observe(time.perf_counter() - start, "ws:batch")
+            if not conn.ws.closed:
+                await conn.ws.send_str(reply)
+
+        # POST /api/batch {"requests": [...]}: same as a /ws batch, for clients without a socket.
+        # Replies stream back as newline-delimited JSON, one line per request as it completes.
+        @timed(HANDLER_SECONDS, 'api_batch')
+        async def handle_api_batch(request):
+            try:
+                message = await request.json()
+                if not isinstance(message, dict):
+                    raise ValueError("expected a JSON object")
+                requests = batch_requests(message)
+            except ValueError as e:
+                return web.json_response({"error": f"Bad request: {e}"}, status=400)
+
+            response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson; charset=utf-8', 'Cache-Control': 'no-store'})
+            await response.prepare(request)
+            async for reply in batch_replies(None, requests):
+                await response.write(reply.encode('utf-8') + b"\n")
+            await response.write_eof()
+            return response
+
+        # Prometheus scrape endpoint
+        async def handle_metrics(request):
+            return web.Response(body=METRICS.render().encode('utf-8'), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+        # One long-lived, multiplexed socket: {"id", "type", ...} requests, replies echo the id,
+        # and subscribers get {"type": "push", "topic", "data"} whenever a topic changes
+        async def handle_ws(request):
+            ws = Plugin.lifecycle.track_websocket(web.WebSocketResponse(heartbeat=WS_HEARTBEAT))
+            await ws.prepare(request)
+            conn = Connection(ws)
+            Plugin.pubsub.register(conn)
+            pending = set()
+            try:
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        continue
+                    try:
+                        message = json.loads(msg.data)
+                        if not isinstance(message, dict):
+                            raise ValueError("expected a JSON object")
+                    except ValueError as e:
+                        await ws.send_json({"id": None, "error": f"Bad request: {e}"})
+                        continue
+                    # Handle requests concurrently so a slow fetch doesn't hold up the rest
+                    task = asyncio.ensure_future(handle_ws_message(conn, message))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            finally:
+                Plugin.pubsub.unregister(conn)
+                for task in pending:
+                    task.cancel()
+            return ws
 
         # Set up the web application
         app = web.Application()
         app.router.add_get('/votd_ws', handle_votd_ws)
         app.router.add_get('/check_update', handle_check_update)
+        app.router.add_get('/ws', handle_ws)
+        app.router.add_get('/api/votd', handle_api_votd)
+        app.router.add_get('/api/update', handle_api_update)
+        app.router.add_get('/votd', handle_votd_by_date)
+        app.router.add_get('/votd/range', handle_votd_range)
+        app.router.add_post('/votd/backfill', handle_votd_backfill)
+        app.router.add_get('/images/{name}', handle_image)
+        app.router.add_get('/metrics', handle_metrics)
+        app.router.add_post('/api/batch', handle_api_batch)
+
+        # Everything is already written as it changes; this catches anything a failed write missed.
+        # Background writes finish first, so nothing else is writing these files.
+        async def flush_caches():
+            await Plugin.writer.close()
+            save_votd_cache(Plugin.votd_cache)
+            save_votd_archive(Plugin.votd_archive)
+            write_json_file(IMAGE_INDEX_PATH, Plugin.image_index)
+            if Plugin.update_cache:
+                write_json_file(UPDATE_CACHE_PATH, {'update': Plugin.update_cache, 'github': Plugin.github_cache})
+
+        Plugin.lifecycle.on_shutdown("caches", flush_caches)
+        Plugin.lifecycle.on_shutdown("in-flight fetches", Plugin.inflight.cancel)
 
         # Set up the web server
-        runner = web.AppRunner(app)
-        await runner.setup()
-        site = web.TCPSite(runner, 'localhost', 8777)
-        await site.start()
-        decky_plugin.logger.info("Server started at http://localhost:8777")
+        listen_tcp = Plugin.settings['listen_tcp']
+        if not listen_tcp and not Plugin.settings['unix_socket']:
+            decky_plugin.logger.warning("Both listeners are disabled in settings, listening on TCP anyway")
+            listen_tcp = True
+        await Plugin.lifecycle.start(app, SERVER_HOST if listen_tcp else None, SERVER_PORT, UNIX_SOCKET_PATH if Plugin.settings['unix_socket'] else None)
+        write_json_file(SERVER_INFO_PATH, Plugin.lifecycle.endpoints())
+        Plugin.lifecycle.on_shutdown("server info", lambda: os.path.exists(SERVER_INFO_PATH) and os.remove(SERVER_INFO_PATH))
+        decky_plugin.logger.info(f"Server started: {Plugin.lifecycle.endpoints()}")
+
+        # The plugin may have been updated since the cached check, so re-derive its status
+        Plugin.local_version = await fetch_local_version()
+        cached_update = Plugin.update_cache.get('data')
+        if cached_update and Plugin.local_version and cached_update.get('local_version') != Plugin.local_version:
+            Plugin.update_cache['data'] = update_status(Plugin.local_version, cached_update.get('github_version'))
+
+        # Keep both caches warm so handlers can always answer without waiting on the network
+        Plugin.lifecycle.spawn(keep_fresh("update info", refresh_update_info, update_due_in))
+        Plugin.votd_tracked = {}
+        try:
+            configured_locales = parse_votd_keys(",".join(Plugin.settings['votd_locales']))
+        except ValueError as e:
+            decky_plugin.logger.error(f"Ignoring votd_locales setting: {e}")
+            configured_locales = [(DEFAULT_LOCALE, None)]
+        for locale, version in configured_locales:
+            track_votd(locale, version, configured=True)
+        Plugin.lifecycle.spawn(rollover_at_midnight())
+
+        # Backfill the last few days so browsing recent verses is an archive lookup
+        today = datetime.date.today()
+        backfill_start = max(first_archive_day(), today - datetime.timedelta(days=VOTD_BACKFILL_DAYS))
+        Plugin.lifecycle.spawn(backfill_votd(backfill_start, today - datetime.timedelta(days=1)))
+
+        # Serve until _unload shuts everything down
+        await Plugin.lifecycle.wait()
 
-        # Keep the server running indefinitely
-        await asyncio.Event().wait()
+    # Called by the frontend to find the server, which is not on SERVER_PORT if that was taken
+    async def get_server_info(self):
+        if not Plugin.lifecycle:
+            return {'host': SERVER_HOST, 'port': None, 'unix_socket': None}
+        return Plugin.lifecycle.endpoints()
 
     async def _unload(self):
         decky_plugin.logger.info("Plugin Unloaded!")
-        # Perform any necessary cleanup
-        pass
\ No newline at end of file
+        # Drain requests, stop the server and tasks, flush caches and close pools
+        if Plugin.lifecycle:
+            await Plugin.lifecycle.shutdown()
+            Plugin.lifecycle = None
+        # Start from a clean slate if the plugin gets loaded again in this process
+        Plugin.log_handler = None
+        Plugin.executor = None
+        Plugin.http = None
+        Plugin.votd_tracked = {}
+        Plugin.image_failures = {}
+        Plugin.votd_failures = {}
+        Plugin.inflight = SingleFlight()
+        Plugin.pubsub = PubSub()
+        Plugin.payloads = PayloadCache()
\ No newline at end of file
@@ -0,0 +1,136 @@
+# Verse of the Day page parsers.
+#
+# Kept free of decky_plugin so the benchmark in benchmarks/ can import it on its own.
+# Strategies are tried in registry order; each has a cheap detect() so that only the
+# strategy that recognises the page runs its regexes, and every result is validated.
+
+import html
+import json
+import re
+
+BIBLE_BASE_URL = "https://www.bible.com"
+
+NEXT_DATA_OPEN = b'<script id="__NEXT_DATA__" type="application/json">'
+NEXT_DATA_CLOSE = b'</script>'
+
+# Compiled once at import, shared by every strategy
+IMAGE_RE = re.compile(rb'<a class="block[^>]*><img src="([^"]+)"')
+# The legacy page used to need three findall passes; one alternation finds all three fields
+LEGACY_RE = re.compile(
+    rb'<a class="text-text-light w-full no-underline"[^>]*>(?P<verse>.+?)</a>'
+    rb'|<p class="text-gray-25">(?P<citation>.+?)</p>'
+    rb'|<a class="block[^>]*><img src="(?P<image>[^"]+)"',
+    re.S,
+)
+LEGACY_MARKER = b'<p class="text-gray-25">'
+NEWLINE_RE = re.compile(r'\n')
+
+class VotdParseError(ValueError):
+    pass
+
+# src attributes are HTML-escaped (&amp; between query parameters), so unescape them
+def image_urls(sources):
+    return [f"{BIBLE_BASE_URL}{html.unescape(src.decode('utf-8', 'replace'))}" for src in sources]
+
+# Raise VotdParseError unless votd has the shape the frontend expects
+def validate_votd(votd):
+    for field in ('citation', 'passage'):
+        if not isinstance(votd.get(field), str) or not votd[field].strip():
+            raise VotdParseError(f"missing {field}")
+    if votd.get('version') is not None and not isinstance(votd['version'], str):
+        raise VotdParseError("version is not a string")
+    images = votd.get('images')
+    if not isinstance(images, list) or not all(isinstance(url, str) and url.startswith(BIBLE_BASE_URL) for url in images):
+        raise VotdParseError("images must be a list of bible.com URLs")
+    return votd
+
+# Current bible.com layout: everything we need is in the Next.js __NEXT_DATA__ JSON
+class NextDataStrategy:
+    name = 'next_data'
+
+    def detect(self, html, next_data):
+        return next_data is not None or NEXT_DATA_OPEN in html
+
+    def parse(self, html, next_data, logger=None):
+        if next_data is None:
+            # Plain substring search: much cheaper than a lazy .+? over the whole JSON payload
+            start = html.find(NEXT_DATA_OPEN) + len(NEXT_DATA_OPEN)
+            end = html.find(NEXT_DATA_CLOSE, start)
+            if end < 0:
+                raise VotdParseError("__NEXT_DATA__ script not closed")
+            next_data = html[start:end]
+        try:
+            json_obj = json.loads(next_data)  # json.loads takes UTF-8 bytes directly
+            page_props = json_obj['props']['pageProps']
+            verse = page_props['verses'][0]
+            return {
+                'citation': verse['reference']['human'],
+                'passage': verse['content'].replace('\n', ' '),
+                'images': image_urls(IMAGE_RE.findall(html)),
+                'version': page_props['versionData']['abbreviation'],
+            }
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise VotdParseError(f"unexpected __NEXT_DATA__ layout: {e!r}") from e
+
+# The old server-rendered layout, scraped straight from the markup
+class LegacyStrategy:
+    name = 'legacy'
+
+    def detect(self, html, next_data):
+        return LEGACY_MARKER in html
+
+    def parse(self, html, next_data, logger=None):
+        verses_array = []
+        citations_array = []
+        images_matches = []
+        version = None
+
+        # Match on bytes and only decode the fragments we keep
+        for match in LEGACY_RE.finditer(html):
+            verse, citation, image = match.group('verse', 'citation', 'image')
+            if citation is not None:
+                citation_text = citation.decode('utf-8', 'replace').strip()
+                version = citation_text[-4:].replace('(', '').replace(')', '')
+                citation_text = citation_text[:-6]
+                citations_array.append(citation_text)
+                if logger:
+                    logger.debug("Citation: %s", citation_text)
+            elif verse is not None:
+                unformatted_verse = NEWLINE_RE.sub(' ', verse.decode('utf-8', 'replace').strip())
+                verses_array.append(unformatted_verse)
+                if logger:
+                    logger.debug("Verse: %s", unformatted_verse)
+            else:
+                images_matches.append(image)
+
+        image_array = image_urls(images_matches)
+        if logger:
+            logger.debug("Found %d images", len(image_array))
+
+        return {
+            'citation': citations_array[0] if citations_array else '',
+            'passage': verses_array[0] if verses_array else '',
+            'images': image_array,
+            'version': version,
+        }
+
+STRATEGIES = [NextDataStrategy(), LegacyStrategy()]
+
+def register_strategy(strategy, index=None):
+    if index is None:
+        STRATEGIES.append(strategy)
+    else:
+        STRATEGIES.insert(index, strategy)
+
+# Turn a VOTD page into ({'citation', 'passage', 'images', 'version'}, strategy name).
+# html is raw bytes; next_data is the __NEXT_DATA__ payload if a streaming read already cut it out.
+def parse_votd_page(html, next_data=None, logger=None):
+    errors = []
+    for strategy in STRATEGIES:
+        if not strategy.detect(html, next_data):
+            continue
+        try:
+            return validate_votd(strategy.parse(html, next_data, logger)), strategy.name
+        except VotdParseError as e:
+            errors.append(f"{strategy.name}: {e}")
+    raise VotdParseError("; ".join(errors) or "no parser recognised the page")
@@ -0,0 +1,193 @@
+// Single long-lived WebSocket to the plugin backend, shared by every hook.
+// Requests carry an id that the backend echoes back; subscriptions receive pushes
+// whenever the backend's cached value for a topic changes.
+
+import { ServerAPI } from "decky-frontend-lib";
+
+const DEFAULT_PORT = 8777;
+const RECONNECT_DELAY_MAX = 30000;
+const BATCH_MAX_REQUESTS = 32; // The backend rejects larger batches
+
+type Message = { [key: string]: any };
+type Listener = (data: any) => void;
+
+let serverAPI: ServerAPI | null = null;
+let socket: WebSocket | null = null;
+let resolving = false;
+let nextId = 1;
+let reconnectDelay = 1000;
+let connectedBefore = false;
+const pending = new Map<number, { resolve: (data: any) => void; reject: (error: Error) => void }>();
+const outbox: string[] = [];
+// Topic key -> subscribe message and listeners, so subscriptions survive reconnects
+const subscriptions = new Map<string, { message: Message; listeners: Set<Listener> }>();
+
+const topicKey = (message: Message) => JSON.stringify([message.topic, message.locale ?? null, message.version ?? null]);
+
+// Messages sent in the same tick go out as one batch frame, so opening the panel
+// (VOTD and update status together) costs a single round-trip
+let queued: Message[] = [];
+
+const send = (message: Message) => {
+  queued.push(message);
+  if (queued.length === 1) {
+    setTimeout(flush, 0);
+  }
+};
+
+const flush = () => {
+  const messages = queued;
+  queued = [];
+  for (let start = 0; start < messages.length; start += BATCH_MAX_REQUESTS) {
+    const chunk = messages.slice(start, start + BATCH_MAX_REQUESTS);
+    sendFrame(JSON.stringify(chunk.length === 1 ? chunk[0] : batch(chunk)));
+  }
+};
+
+// Sub-replies carry their own ids and arrive before the batch's closing reply. If the
+// backend rejects the batch as a whole, fail every sub-request that is still waiting.
+const batch = (messages: Message[]): Message => {
+  const id = nextId++;
+  const settle = (error: Error) => {
+    messages.forEach((message) => {
+      pending.get(message.id)?.reject(error);
+      pending.delete(message.id);
+    });
+  };
+  pending.set(id, { resolve: () => settle(new Error("No reply in batch")), reject: settle });
+  return { id, type: "batch", requests: messages };
+};
+
+const sendFrame = (data: string) => {
+  if (socket && socket.readyState === WebSocket.OPEN) {
+    socket.send(data);
+  } else {
+    outbox.push(data);
+    connect();
+  }
+};
+
+const request = (message: Message): Promise<any> => {
+  const id = nextId++;
+  return new Promise((resolve, reject) => {
+    pending.set(id, { resolve, reject });
+    send({ ...message, id });
+  });
+};
+
+export const setServerAPI = (api: ServerAPI) => {
+  serverAPI = api;
+};
+
+// The backend moves to another port when 8777 is taken, so ask it where it is listening
+const backendUrl = async (): Promise<string> => {
+  try {
+    const response = await serverAPI?.callPluginMethod<{}, { port: number | null }>("get_server_info", {});
+    if (response?.success && response.result.port) {
+      return `ws://localhost:${response.result.port}/ws`;
+    }
+  } catch (error) {
+    console.error("Could not get the backend's address:", error);
+  }
+  return `ws://localhost:${DEFAULT_PORT}/ws`;
+};
+
+const connect = () => {
+  if (resolving || (socket && (socket.readyState === WebSocket.OPEN || socket.readyState === WebSocket.CONNECTING))) {
+    return;
+  }
+  resolving = true;
+  backendUrl().then((url) => {
+    resolving = false;
+    openSocket(url);
+  });
+};
+
+const openSocket = (url: string) => {
+  socket = new WebSocket(url);
+
+  socket.onopen = () => {
+    console.log("Backend WebSocket connected");
+    reconnectDelay = 1000;
+    // After a reconnect the backend has forgotten our subscriptions, so make them again
+    if (connectedBefore) {
+      subscriptions.forEach(({ message }) => {
+        request(message).then((data) => subscriptions.get(topicKey(message))?.listeners.forEach((listener) => listener(data)));
+      });
+    }
+    connectedBefore = true;
+    // Flush anything queued while disconnected
+    outbox.splice(0).forEach((data) => socket?.send(data));
+  };
+
+  socket.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    if (message.type === "push") {
+      subscriptions.forEach(({ message: subscribe, listeners }) => {
+        if (message.topic === subscriptionTopic(subscribe)) {
+          listeners.forEach((listener) => listener(message.data));
+        }
+      });
+      return;
+    }
+    const waiter = pending.get(message.id);
+    if (!waiter) {
+      return;
+    }
+    pending.delete(message.id);
+    if (message.error) {
+      waiter.reject(new Error(message.error));
+    } else {
+      waiter.resolve(message.data);
+    }
+  };
+
+  socket.onclose = () => {
+    console.log("Backend WebSocket closed, reconnecting");
+    pending.forEach(({ reject }) => reject(new Error("WebSocket closed")));
+    pending.clear();
+    socket = null;
+    if (subscriptions.size > 0 || outbox.length > 0) {
+      setTimeout(connect, reconnectDelay);
+      reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_DELAY_MAX);
+    }
+  };
+
+  socket.onerror = (error) => {
+    console.error("Backend WebSocket error:", error);
+  };
+};
+
+// Mirrors the topic names used by the backend's PubSub
+const subscriptionTopic = (message: Message) =>
+  message.topic === "votd" ? `votd:${message.locale ?? "en"}:${message.version ?? ""}` : message.topic;
+
+// Subscribe to a topic; the listener gets the current value first, then every change.
+// Returns an unsubscribe function.
+export const subscribe = (message: Message, listener: Listener, onError?: (error: Error) => void): (() => void) => {
+  const key = topicKey(message);
+  let entry = subscriptions.get(key);
+  if (entry) {
+    entry.listeners.add(listener);
+  } else {
+    entry = { message: { ...message, type: "subscribe" }, listeners: new Set([listener]) };
+    subscriptions.set(key, entry);
+  }
+  request(entry.message).then(listener, (error) => onError?.(error));
+
+  return () => {
+    const current = subscriptions.get(key);
+    if (!current) {
+      return;
+    }
+    current.listeners.delete(listener);
+    if (current.listeners.size === 0) {
+      subscriptions.delete(key);
+      if (socket && socket.readyState === WebSocket.OPEN) {
+        request({ ...current.message, type: "unsubscribe" }).catch(() => undefined);
+      }
+    }
+  };
+};
+
+export const call = request;
@@ -1,7 +1,8 @@
 import { useState, useEffect } from 'react';
+import { subscribe } from './backend';
 
 interface UpdateInfo {
-  status: string;  // "Up-to-date" or "Update available"
+  status: string;  // "Up-to-date", "Update available" or "Checking"
   local_version: string;
   github_version: string;
 }
@@ -11,53 +12,38 @@ export const useUpdateInfo = () => {
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState<boolean>(true);
 
-  // WebSocket connection to check for updates
-  const fetchUpdateInfo = (): (() => void) => {
+  useEffect(() => {
     setLoading(true);
-    console.log("Connecting to WebSocket to check for updates...");
-
-    const socket = new WebSocket("ws://localhost:8777/check_update");
-
-    socket.onopen = () => {
-      console.log("WebSocket connected to check update");
-    };
+    console.log("Subscribing to update information...");
+
+    // The shared backend socket sends the current status first, then pushes every change
+    const unsubscribe = subscribe(
+      { topic: "update" },
+      (data) => {
+        console.log("Received update information:", data);
+
+        if (data.error) {
+          setError(data.error);
+        } else {
+          const { status, local_version, github_version } = data;
+          setUpdateInfo({
+            status,
+            local_version,
+            github_version
+          });
+          setError(null);
+        }
+        setLoading(false);
+      },
+      (error) => {
+        console.error("WebSocket error:", error);
+        setError("WebSocket error occurred while checking for updates.");
+        setLoading(false);
+      },
+    );
 
-    socket.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      console.log("Received update information:", data);
-
-      if (data.error) {
-        setError(data.error);
-      } else {
-        const { status, local_version, github_version } = data;
-        setUpdateInfo({
-          status,
-          local_version,
-          github_version
-        });
-      }
-      setLoading(false);
-    };
-
-    socket.onerror = (error) => {
-      console.error("WebSocket error:", error);
-      setError("WebSocket error occurred while checking for updates.");
-      setLoading(false);
-    };
-
-    socket.onclose = () => {
-      console.log("WebSocket connection closed");
-    };
-
-    return () => {
-      socket.close();
-    };
-  };
-
-  useEffect(() => {
-    const socketCleanup = fetchUpdateInfo();
     return () => {
-      socketCleanup();  // Cleanup WebSocket connection on unmount
+      unsubscribe();  // Drop the subscription on unmount; the socket itself stays open
     };
   }, []);
 
@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react';
+import { subscribe } from './backend';
 
 interface VerseOfTheDay {
   citation: string;
@@ -12,56 +13,41 @@ export const useVOTD = () => {
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState<boolean>(true);
 
-  // WebSocket connection to fetch Verse of the Day data
-  const fetchVerseOfTheDay = (): (() => void) => {
+  useEffect(() => {
     setLoading(true);
-    console.log("Connecting to WebSocket for Verse of the Day...");
-
-    const socket = new WebSocket("ws://localhost:8777/votd_ws");
-
-    socket.onopen = () => {
-      console.log("WebSocket connected");
-    };
+    console.log("Subscribing to Verse of the Day...");
+
+    // The shared backend socket sends the current verse first, then pushes every change
+    const unsubscribe = subscribe(
+      { topic: "votd" },
+      (data) => {
+        console.log("Received Verse of the Day:", data);
+
+        if (data.error) {
+          setError(data.error);
+        } else {
+          const { citation, passage, images, version } = data;
+          setVerseOfTheDay({
+            citation: citation.toString(),
+            passage: passage.toString(),
+            images: images ?? [],
+            version: version ?? "Unknown",
+          });
+          setError(null);
+        }
+        setLoading(false);
+      },
+      (error) => {
+        console.error("WebSocket error:", error);
+        setError("WebSocket error occurred.");
+        setLoading(false);
+      },
+    );
 
-    socket.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      console.log("Received Verse of the Day:", data);
-
-      if (data.error) {
-        setError(data.error);
-      } else {
-        const { citation, passage, images, version } = data;
-        setVerseOfTheDay({
-          citation: citation.toString(),
-          passage: passage.toString(),
-          images: images ?? [],
-          version: version ?? "Unknown",
-        });
-      }
-      setLoading(false);
-    };
-
-    socket.onerror = (error) => {
-      console.error("WebSocket error:", error);
-      setError("WebSocket error occurred.");
-      setLoading(false);
-    };
-
-    socket.onclose = () => {
-      console.log("WebSocket connection closed");
-    };
-
-    return () => {
-      socket.close();
-    };
-  };
-
-  useEffect(() => {
-    const socketCleanup = fetchVerseOfTheDay();
     return () => {
-      socketCleanup();  // Cleanup WebSocket connection on unmount
+      unsubscribe();  // Drop the subscription on unmount; the socket itself stays open
     };
   }, []);
 
   return { verseOfTheDay, error, loading };
-};
\ No newline at end of file
+};
@@ -1,8 +1,9 @@
-import { definePlugin, ButtonItem } from "decky-frontend-lib";
+import { definePlugin, ButtonItem, ServerAPI } from "decky-frontend-lib";
 import { useState, useRef } from "react";
 import { FaBible } from "react-icons/fa";
 import { useVOTD } from './getVOTD';  
 import { useUpdateInfo } from './getUpdate'; // Import the custom useUpdateInfo hook
+import { setServerAPI } from './backend';
 import books from './books.json';    
 import verses from './verses.json';  
 
@@ -263,7 +264,8 @@ const Content = () => {
   );
 };
 
-export default definePlugin(() => {
+export default definePlugin((serverApi: ServerAPI) => {
+  setServerAPI(serverApi);
   return {
     title: <div>Verse of the Day</div>,
     content: <Content />,